@@ -0,0 +1,193 @@
+"""Submission analytics for operators, served apart from the form.
+
+It is its own Streamlit entry point, not a page of app.py, so form users
+never see it in their sidebar. Run it on another port, next to the app and
+against the same storage:
+
+    AGENT_FORM_ADMIN_TOKEN=... streamlit run admin_dashboard.py --server.port 8502
+"""
+import hmac
+import os
+from datetime import datetime
+
+import streamlit as st
+
+import exports
+from storage import DEFAULT_STORAGE_URL, StorageBackend, shared_storage
+from schema import FREQUENCIES, LEVELS
+
+# Settings
+STORAGE_URL = os.environ.get("AGENT_FORM_STORAGE", DEFAULT_STORAGE_URL)
+ADMIN_TOKEN = os.environ.get("AGENT_FORM_ADMIN_TOKEN", "")
+ROLLUP_ROWS = 15  # Businesses/sections listed per breakdown
+TOP_CASES = 25
+
+st.set_page_config(page_title="Agent Form Analytics", layout="wide")
+
+def get_storage() -> StorageBackend:
+    """Return the storage backend shared by every page in this server process."""
+    return shared_storage(STORAGE_URL)
+
+def rollup_chart(dimension: str, order=None, limit=None):
+    """Chart one dimension's use case counts and list its averages."""
+    rows = get_storage().rollup(dimension, limit)
+    if order is not None:
+        rank = {key: position for position, key in enumerate(order)}
+        rows.sort(key=lambda row: rank.get(row["key"], len(rank)))
+    if not rows:
+        st.caption("No data yet.")
+        return
+    st.bar_chart({"Use cases": {row["key"]: row["use_cases"] for row in rows}}, height=220)
+    st.dataframe(
+        {
+            dimension.title(): [row["key"] for row in rows],
+            "Submissions": [row["submissions"] for row in rows],
+            "Use cases": [row["use_cases"] for row in rows],
+            "Avg value": [row["avg_value"] for row in rows],
+            "Avg impact": [row["avg_impact"] for row in rows],
+            "Avg score": [row["avg_score"] for row in rows],
+        },
+        hide_index=True
+    )
+
+def prepare_submissions_export(fmt: str, compression=None):
+    """Export every stored submission into this session, for the download button.
+
+    Rows are streamed from the database, but the file is built in memory:
+    Streamlit keeps every download payload in server memory, so the whole
+    export is held there until the page reruns. Large exports should use
+    ``python exports.py``, which streams to a file on disk instead.
+    """
+    payload = exports.export_bytes(exports.submission_rows(get_storage().iter_submissions()), fmt, compression)
+    st.session_state["submissions_export"] = ((fmt, compression), datetime.now(), payload)
+
+st.markdown("<h1 style='text-align: center; color: black;'> 📊 Submission Analytics </h1>", unsafe_allow_html=True)
+
+# Operators only: the page shows every business's submissions
+if not ADMIN_TOKEN:
+    st.info("Set AGENT_FORM_ADMIN_TOKEN on the server to enable this page.")
+    st.stop()
+token = st.text_input("Admin token", type="password", key="admin_token")
+if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+    if token:
+        st.error("Invalid admin token.")
+    st.stop()
+
+# Totals (read from the materialized rollups, so constant time)
+totals = get_storage().totals()
+total_cols = st.columns(5)
+total_cols[0].metric("Submissions", f"{totals['submissions']:,}")
+total_cols[1].metric("Businesses", f"{totals['businesses']:,}")
+total_cols[2].metric("Use cases", f"{totals['use_cases']:,}")
+total_cols[3].metric("Avg value", totals["avg_value"])
+total_cols[4].metric("Avg impact", totals["avg_impact"])
+
+# Breakdowns
+st.subheader("Breakdowns")
+breakdown_tabs = st.tabs(["Business", "Section", "Priority", "Feasibility", "Frequency", "Complexity"])
+with breakdown_tabs[0]:
+    rollup_chart("business", limit=ROLLUP_ROWS)
+with breakdown_tabs[1]:
+    rollup_chart("section", limit=ROLLUP_ROWS)
+with breakdown_tabs[2]:
+    rollup_chart("priority", order=LEVELS)
+with breakdown_tabs[3]:
+    rollup_chart("feasibility", order=LEVELS)
+with breakdown_tabs[4]:
+    rollup_chart("frequency", order=FREQUENCIES)
+with breakdown_tabs[5]:
+    rollup_chart("complexity", order=LEVELS)
+
+# Score distributions
+st.subheader("Score Distributions")
+score_range = [str(score) for score in range(1, 11)]
+distribution_cols = st.columns(2)
+with distribution_cols[0]:
+    st.markdown("**Business Value**")
+    rollup_chart("value", order=score_range)
+with distribution_cols[1]:
+    st.markdown("**User Impact**")
+    rollup_chart("impact", order=score_range)
+
+# Drill-down: every filter column has a (column, score) index
+st.subheader("Top-Ranked Use Cases")
+filter_cols = st.columns(5)
+filters = {
+    "business_name": filter_cols[0].text_input("Business", key="filter_business").strip(),
+    "section": filter_cols[1].text_input("Section", key="filter_section").strip(),
+    "priority": filter_cols[2].selectbox("Priority", [""] + LEVELS, key="filter_priority"),
+    "feasibility": filter_cols[3].selectbox("Feasibility", [""] + LEVELS, key="filter_feasibility"),
+    "frequency": filter_cols[4].selectbox("Frequency", [""] + FREQUENCIES, key="filter_frequency"),
+}
+leaders = get_storage().top_cases(TOP_CASES, **filters)
+if leaders:
+    st.dataframe(
+        {
+            "Score": [case["score"] for case in leaders],
+            "Business": [case["business_name"] for case in leaders],
+            "Section": [case["section"] for case in leaders],
+            "Use Case": [case["use_case"] for case in leaders],
+            "Value": [case["value"] for case in leaders],
+            "Impact": [case["impact"] for case in leaders],
+            "Priority": [case["priority"] for case in leaders],
+            "Feasibility": [case["feasibility"] for case in leaders],
+            "Frequency": [case["frequency"] for case in leaders],
+        },
+        hide_index=True
+    )
+else:
+    st.caption("No submitted use cases match these filters.")
+
+# Full-text search over every submitted use case (FTS5 index)
+st.subheader("Search Submissions")
+search_cols = st.columns([3, 1, 1])
+query = search_cols[0].text_input("Search", key="admin_search_query",
+                                  placeholder="Words or word beginnings from any text field")
+search_section = search_cols[1].text_input("Section", key="admin_search_section").strip()
+search_priority = search_cols[2].selectbox("Priority", [""] + LEVELS, key="admin_search_priority")
+if query.strip():
+    matches = get_storage().search_cases(query, search_section, search_priority, limit=TOP_CASES)
+    if matches:
+        st.dataframe(
+            {
+                "Business": [match["business_name"] for match in matches],
+                "Section": [match["section"] for match in matches],
+                "Use Case": [match["use_case"] for match in matches],
+                "Priority": [match["priority"] for match in matches],
+                "Relevance": [round(match["score"], 2) for match in matches],
+            },
+            hide_index=True
+        )
+    else:
+        st.caption("No submitted use cases match your search.")
+
+# Bulk export of every submission, one row per use case
+st.subheader("Export Submissions")
+export_cols = st.columns([1, 1, 2])
+export_format = export_cols[0].selectbox(
+    "Format", exports.available_formats(), format_func=lambda fmt: exports.FORMATS[fmt].label,
+    key="export_format"
+)
+export_compression = export_cols[1].selectbox(
+    "Compression", ["None"] + exports.compressions_for(export_format), key="export_compression"
+)
+export_compression = None if export_compression == "None" else export_compression
+prepared = st.session_state.get("submissions_export")
+if prepared and prepared[0] == (export_format, export_compression):
+    _, prepared_at, payload = prepared
+    stem = f"agent_form_submissions_{prepared_at.strftime('%Y%m%d_%H%M%S')}"
+    export_cols[2].download_button(
+        f"📥 Download all submissions ({exports.FORMATS[export_format].label})",
+        data=payload,
+        file_name=exports.file_name(stem, export_format, export_compression),
+        mime=exports.mime_type(export_format, export_compression),
+        key="download_submissions",
+        on_click="ignore"
+    )
+    export_cols[2].caption(f"Prepared at {prepared_at:%H:%M:%S} ({len(payload) / 1024 ** 2:,.1f} MB, held in "
+                           "server memory). For very large exports run `python exports.py` on the server.")
+else:
+    export_cols[2].button(
+        f"⚙️ Prepare export ({exports.FORMATS[export_format].label})", key="prepare_submissions",
+        on_click=prepare_submissions_export, args=(export_format, export_compression)
+    )
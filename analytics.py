@@ -0,0 +1,218 @@
+"""Materialized rollups over stored submissions, for the operator dashboard.
+
+Each submission is exploded into one ``submission_cases`` row per use case
+and folded into the ``rollups`` counters inside the same transaction that
+stores it. The dashboard then reads a few small, indexed tables instead of
+re-parsing every payload. A watermark records the last submission folded
+in, which also backfills submissions stored before the rollups existed and
+picks up submissions written by other server processes.
+"""
+import json
+import sqlite3
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from scoring import DEFAULT_WEIGHTS, normalize_weights, score_case
+from store import CASE_FIELDS, UseCase
+
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submission_cases (
+    submission_id INTEGER NOT NULL,
+    business_name TEXT NOT NULL,
+    section TEXT NOT NULL,
+    use_case TEXT NOT NULL,
+    value INTEGER,
+    impact INTEGER,
+    feasibility TEXT,
+    frequency TEXT,
+    complexity TEXT,
+    priority TEXT,
+    score REAL NOT NULL,
+    submitted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cases_score ON submission_cases (score DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_business ON submission_cases (business_name, score DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_section ON submission_cases (section, score DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_priority ON submission_cases (priority, score DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_feasibility ON submission_cases (feasibility, score DESC);
+CREATE INDEX IF NOT EXISTS idx_cases_frequency ON submission_cases (frequency, score DESC);
+CREATE TABLE IF NOT EXISTS rollups (
+    dimension TEXT NOT NULL,
+    key TEXT NOT NULL,
+    submissions INTEGER NOT NULL DEFAULT 0,
+    use_cases INTEGER NOT NULL DEFAULT 0,
+    value_sum REAL NOT NULL DEFAULT 0,
+    impact_sum REAL NOT NULL DEFAULT 0,
+    score_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rollups_size ON rollups (dimension, use_cases DESC);
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Rollup dimensions; "value" and "impact" are keyed by the 1-10 score, so
+# their counts form the score distributions
+DIMENSIONS = ("business", "section", "priority", "feasibility", "frequency", "complexity", "value", "impact")
+TOTAL = "total"  # Dimension with a single "" key holding the grand totals
+
+# Columns that drill-down queries may filter on (each has a score index)
+FILTERS = ("business_name", "section", "priority", "feasibility", "frequency")
+
+FOLD_CHUNK = 500  # Submissions read per round while catching up
+_WEIGHTS = normalize_weights(DEFAULT_WEIGHTS)
+
+
+def case_rows(submission_id: int, payload: Dict, submitted_at: float) -> List[Tuple]:
+    """Flatten one submission payload into ``submission_cases`` rows."""
+    business_name = payload.get("business_name", "")
+    rows = []
+    for section, cases in (payload.get("target_sections") or {}).items():
+        for fields in cases:
+            case = UseCase(0, section, **{field: fields[field] for field in CASE_FIELDS if field in fields})
+            rows.append((
+                submission_id, business_name, section, case.use_case, case.value, case.impact,
+                case.feasibility, case.frequency, case.complexity, case.priority,
+                score_case(case, _WEIGHTS), submitted_at,
+            ))
+    return rows
+
+
+def _rollup_keys(row: Tuple) -> List[Tuple[str, str]]:
+    """Return the ``(dimension, key)`` rollups one ``submission_cases`` row counts towards."""
+    _, business_name, section, _, value, impact, feasibility, frequency, complexity, priority, _, _ = row
+    return [
+        (TOTAL, ""),
+        ("business", business_name),
+        ("section", section),
+        ("priority", priority),
+        ("feasibility", feasibility),
+        ("frequency", frequency),
+        ("complexity", complexity),
+        ("value", str(value)),
+        ("impact", str(impact)),
+    ]
+
+
+def _fold(conn: sqlite3.Connection, submissions: Iterable[Tuple[int, Dict, float]]):
+    """Add submissions to the case table and rollup counters."""
+    # (dimension, key) -> [submissions, use_cases, value_sum, impact_sum, score_sum]
+    deltas: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0, 0, 0, 0.0])
+    case_table = []
+    for submission_id, payload, submitted_at in submissions:
+        rows = case_rows(submission_id, payload, submitted_at)
+        case_table.extend(rows)
+        # A submission counts once per key, however many of its cases share it
+        counted = set()
+        for row in rows:
+            for key in _rollup_keys(row):
+                delta = deltas[key]
+                if key not in counted:
+                    counted.add(key)
+                    delta[0] += 1
+                delta[1] += 1
+                delta[2] += row[4]
+                delta[3] += row[5]
+                delta[4] += row[10]
+
+    conn.executemany("INSERT INTO submission_cases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", case_table)
+    conn.executemany(
+        "INSERT INTO rollups (dimension, key, submissions, use_cases, value_sum, impact_sum, score_sum) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(dimension, key) DO UPDATE SET "
+        "submissions = submissions + excluded.submissions, use_cases = use_cases + excluded.use_cases, "
+        "value_sum = value_sum + excluded.value_sum, impact_sum = impact_sum + excluded.impact_sum, "
+        "score_sum = score_sum + excluded.score_sum",
+        [(dimension, key, *delta) for (dimension, key), delta in deltas.items()],
+    )
+
+
+def fold_new_submissions(conn: sqlite3.Connection, watermark_name: str,
+                         fold: Callable[[sqlite3.Connection, List[Tuple[int, Dict, float]]], None]) -> int:
+    """Pass every submission past the named watermark to ``fold``, in chunks.
+
+    Must run inside the caller's write transaction, so a submission and the
+    tables derived from it commit together. Returns how many were folded.
+    """
+    row = conn.execute("SELECT value FROM rollup_state WHERE name = ?", (watermark_name,)).fetchone()
+    watermark = row[0] if row else 0
+    folded = 0
+    while True:
+        chunk = conn.execute(
+            "SELECT id, payload, submitted_at FROM submissions WHERE id > ? ORDER BY id LIMIT ?",
+            (watermark, FOLD_CHUNK),
+        ).fetchall()
+        if not chunk:
+            break
+        fold(conn, [(sid, json.loads(payload), ts) for sid, payload, ts in chunk])
+        watermark = chunk[-1][0]
+        folded += len(chunk)
+    if folded:
+        conn.execute(
+            "INSERT INTO rollup_state (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (watermark_name, watermark),
+        )
+    return folded
+
+
+def refresh_rollups(conn: sqlite3.Connection) -> int:
+    """Fold every submission not yet in the rollups into them."""
+    return fold_new_submissions(conn, "watermark", _fold)
+
+
+# Dashboard queries; all read the materialized tables through their indexes
+def _aggregate(row: Tuple) -> Dict:
+    key, submissions, use_cases, value_sum, impact_sum, score_sum = row
+    count = use_cases or 1
+    return {
+        "key": key,
+        "submissions": submissions,
+        "use_cases": use_cases,
+        "avg_value": round(value_sum / count, 2),
+        "avg_impact": round(impact_sum / count, 2),
+        "avg_score": round(score_sum / count, 1),
+    }
+
+
+def totals(conn: sqlite3.Connection) -> Dict:
+    """Return the grand totals plus the number of distinct businesses."""
+    row = conn.execute(
+        "SELECT key, submissions, use_cases, value_sum, impact_sum, score_sum "
+        "FROM rollups WHERE dimension = ? AND key = ''", (TOTAL,)
+    ).fetchone()
+    summary = _aggregate(row or ("", 0, 0, 0, 0, 0))
+    summary["businesses"] = conn.execute(
+        "SELECT COUNT(*) FROM rollups WHERE dimension = 'business'"
+    ).fetchone()[0]
+    return summary
+
+
+def rollup(conn: sqlite3.Connection, dimension: str, limit: Optional[int] = None) -> List[Dict]:
+    """Return one dimension's aggregates, largest first."""
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Unknown dimension: {dimension!r}")
+    rows = conn.execute(
+        "SELECT key, submissions, use_cases, value_sum, impact_sum, score_sum FROM rollups "
+        "WHERE dimension = ? ORDER BY use_cases DESC LIMIT ?",
+        (dimension, -1 if limit is None else limit),
+    )
+    return [_aggregate(row) for row in rows]
+
+
+def top_cases(conn: sqlite3.Connection, limit: int = 20, **filters) -> List[Dict]:
+    """Return the highest-scoring stored use cases matching equality ``filters``."""
+    unknown = set(filters) - set(FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filters: {', '.join(sorted(unknown))}")
+    conditions = [(column, value) for column, value in filters.items() if value]
+    where = " AND ".join(f"{column} = ?" for column, _ in conditions) or "1"
+    cursor = conn.execute(
+        "SELECT submission_id, business_name, section, use_case, value, impact, feasibility, "
+        f"frequency, complexity, priority, score FROM submission_cases WHERE {where} "
+        "ORDER BY score DESC LIMIT ?",
+        [value for _, value in conditions] + [limit],
+    )
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
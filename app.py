@@ -1,9 +1,59 @@
 import streamlit as st
-import pandas as pd
-import json
-import base64
+import hmac
+import io
+import os
+import time
+import uuid
 from datetime import datetime
-from typing import Dict, List
+from html import escape
+from itertools import islice
+from typing import Dict, Optional
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import exports
+import metrics
+from assets import DOCUMENT_TYPES, HEADER_HTML, IMPORT_TYPES, STYLE_HTML, WELCOME_TEXT
+from storage import DEFAULT_STORAGE_URL, StorageBackend, shared_storage
+from scoring import DEFAULT_WEIGHTS, ScoreIndex
+from search import SearchIndex
+from schema import LEVELS, SCHEMA
+from store import BUSINESS_NAME_REQUIRED, SECTION_REQUIRED, USE_CASE_REQUIRED, UseCase, UseCaseStore
+from dedup import DuplicateIndex
+from extraction import DONE, PENDING, ExtractionPipeline
+from sessions import SessionRegistry, measure_session, purge_case_keys, purge_section_keys
+from uploads import Documents, FileSpool, QuotaExceeded, SpooledFile, session_usage
+
+# Display settings
+CASES_PAGE_SIZE = 10  # Use case cards shown per section before "Load more"
+EXPANDED_SECTIONS_LIMIT = 5  # Sections after this many start collapsed
+CARD_HTML_CACHE_SIZE = 2000  # Memoized card fragments kept per session
+RANKING_TOP_N = 10  # Use cases shown in the overall leaderboard
+SEARCH_RESULTS_LIMIT = 20
+DUPLICATES_SHOWN = 5  # Likely duplicates listed per source when saving a use case
+
+# Storage settings
+STORAGE_URL = os.environ.get("AGENT_FORM_STORAGE", DEFAULT_STORAGE_URL)
+AUTOSAVE_INTERVAL = 15  # Seconds between draft saves (numbers skip Streamlit's pandas-based parsing)
+SUBMIT_TIMEOUT = 30  # Seconds a submission may wait for the storage writer to commit it
+
+# Upload settings
+UPLOAD_SPOOL_DIR = os.environ.get("AGENT_FORM_SPOOL", "agent_form_uploads")
+UPLOAD_SPOOL_MAX_BYTES = 5 * 1024 ** 3  # Shared by all sessions; LRU-evicted beyond this
+SESSION_UPLOAD_QUOTA = 200 * 1024 ** 2
+SESSION_UPLOAD_MAX_FILES = 50
+EXTRACTION_WORKERS = 2  # Worker processes parsing uploaded documents at once
+EXTRACTION_POLL_INTERVAL = 2  # Seconds between grid refreshes while extraction is running
+
+# Session limits
+SESSION_STATE_MAX_BYTES = int(os.environ.get("AGENT_FORM_SESSION_MAX_MB", "64")) * 1024 ** 2
+SESSION_MAX_SECTIONS = 200
+SESSION_MAX_USE_CASES = 5000
+SESSION_REPORT_INTERVAL = 10  # Seconds between memory measurements of one session
+SESSION_REPORT_TTL = 3600  # Sessions silent this long drop out of the server-wide view
+LARGEST_SESSIONS_SHOWN = 10
+# Operators enter this to see other sessions' memory; the server-wide view is off without it
+ADMIN_TOKEN = os.environ.get("AGENT_FORM_ADMIN_TOKEN", "")
 
 st.set_page_config(
     page_title="Agent Form", 
@@ -11,117 +61,46 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for Enhanced UI
-st.markdown("""
-    <style>
-        .main {
-            background-color: #f4f4f9;
-            padding: 1.5rem;
-        }
-        .stButton>button {
-            transition: all 0.3s ease;
-            border: 1px solid #007BFF;
-        }
-        .stButton>button:hover {
-            transform: translateY(-1px);
-            box-shadow: 0 5px 15px rgba(0,123,255,0.3);
-        }
-        .section-header {
-            background: linear-gradient(145deg, #007BFF, #0056b3);
-            color: white !important;
-            padding: 1rem;
-            border-radius: 10px;
-            margin: 1rem 0;
-        }
-        .use-case-box {
-            background-color: #ffffff;
-            border-radius: 10px;
-            padding: 1.5rem;
-            margin: 1rem 0;
-            box-shadow: 0 2px 6px rgba(0,0,0,0.1);
-            border-left: 4px solid #007BFF;
-        }
-        .metric-badge {
-            background-color: #e9f5ff;
-            color: #007BFF;
-            padding: 0.3rem 0.8rem;
-            border-radius: 20px;
-            font-size: 0.9rem;
-            margin: 0.2rem;
-        }
-        .file-uploader .st-emotion-cache-1lnq2i0 {
-            border: 2px dashed #007BFF;
-            border-radius: 10px;
-        }
-        .required-field::after {
-            content: " *";
-            color: red;
-        }
-        .stProgress .st-emotion-cache-1qrvh5p {
-            background-color: #007BFF;
-        }
-        .vertical-progress {
-            height: 200px;
-            writing-mode: vertical-lr;
-            transform: rotate(180deg);
-            margin-top: 20px;
-        }
-        .progress-container {
-            text-align: center;
-            padding: 10px;
-            background-color: #f8f9fa;
-            border-radius: 10px;
-            margin-bottom: 20px;
-        }
-        /* Mobile responsiveness */
-        @media (max-width: 768px) {
-            .main {
-                padding: 0.75rem;
-            }
-            .use-case-box {
-                padding: 1rem;
-            }
-        }
-        /* Toast notifications */
-        .toast {
-            position: fixed;
-            bottom: 20px;
-            right: 20px;
-            padding: 15px 20px;
-            border-radius: 8px;
-            color: white;
-            z-index: 9999;
-            box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-            animation: slideIn 0.3s, fadeOut 0.5s 3.5s forwards;
-        }
-        .toast-success {
-            background-color: #28a745;
-        }
-        .toast-error {
-            background-color: #dc3545;
-        }
-        @keyframes slideIn {
-            from { transform: translateX(100%); }
-            to { transform: translateX(0); }
-        }
-        @keyframes fadeOut {
-            from { opacity: 1; }
-            to { opacity: 0; }
-        }
-    </style>
-""", unsafe_allow_html=True)
-hide_streamlit_style = """
-            <style>
-            #MainMenu {visibility: hidden;}
-            footer {visibility: hidden;}
-            header {visibility: hidden;}
-            </style>
-            """
-st.markdown(hide_streamlit_style, unsafe_allow_html=True) 
+# Instrumentation (no-ops unless AGENT_FORM_METRICS=1)
+metrics.inc("reruns_total")
+script_span = metrics.span("script_run").start()
+
+# Custom CSS for Enhanced UI (read and minified once per process in assets.py)
+with metrics.span("inject_css"):
+    st.html(STYLE_HTML)
+
+def get_storage() -> StorageBackend:
+    """Return the storage backend shared by every page in this server process."""
+    return shared_storage(STORAGE_URL)
+
+@st.cache_resource
+def get_spool() -> FileSpool:
+    """Open the shared upload spool once per server process.
+
+    Eviction skips documents of live sessions and of saved drafts.
+    """
+    return FileSpool(UPLOAD_SPOOL_DIR, UPLOAD_SPOOL_MAX_BYTES, referenced=lambda: get_storage().draft_documents())
+
+@st.cache_resource
+def get_extractor() -> ExtractionPipeline:
+    """Start the document extraction pipeline once per server process."""
+    return ExtractionPipeline(get_spool(), EXTRACTION_WORKERS)
+
+@st.cache_resource
+def get_session_registry() -> SessionRegistry:
+    """Share the memory reports of all sessions in this server process."""
+    return SessionRegistry(ttl=SESSION_REPORT_TTL)
+
+@st.cache_resource
+def start_metrics_exporter():
+    """Start the metrics file writer (and HTTP endpoint) once per server process."""
+    metrics.start_exporter()
+
+start_metrics_exporter()
 
 # Initialize session state
 if "target_sections" not in st.session_state:
-    st.session_state["target_sections"] = {}
+    st.session_state["target_sections"] = UseCaseStore()
     
 if "show_success" not in st.session_state:
     st.session_state["show_success"] = False
@@ -133,44 +112,153 @@ if "show_welcome" not in st.session_state:
     st.session_state["show_welcome"] = True
     st.session_state["welcome_shown"] = False
 
+# Bumped on every change to target_sections; keys the export cache
+if "data_version" not in st.session_state:
+    st.session_state["data_version"] = 0
+
+if "export_cache" not in st.session_state:
+    st.session_state["export_cache"] = {}
+
+if "card_html" not in st.session_state:
+    st.session_state["card_html"] = {}
+
+# Uploaded documents are spooled to disk; the session keeps references by digest
+if "documents" not in st.session_state:
+    st.session_state["documents"] = get_spool().hold(Documents())
+    st.session_state["uploader_generation"] = 0
+
+if "import_generation" not in st.session_state:
+    st.session_state["import_generation"] = 0
+    st.session_state["import_errors"] = None
+
+# Resume a saved draft when the URL carries its id, otherwise start a new one
+if "draft_id" not in st.session_state:
+    draft_id = st.query_params.get("draft")
+    draft = get_storage().load_draft(draft_id) if draft_id else None
+    if draft:
+        st.session_state["target_sections"] = UseCaseStore.from_dict(draft.get("target_sections", {}))
+        st.session_state["business_name"] = draft.get("business_name", "")
+        st.session_state["documents"] = get_spool().hold(Documents(
+            (doc["digest"], SpooledFile(doc["name"], doc["size"], doc["digest"]))
+            for doc in draft.get("documents", [])
+        ))
+        st.session_state["success_message"] = "Your saved draft has been restored."
+        st.session_state["show_success"] = True
+    else:
+        draft_id = uuid.uuid4().hex
+    st.session_state["draft_id"] = draft_id
+    st.session_state["autosaved_version"] = (0, st.session_state.get("business_name", ""))
+    st.query_params["draft"] = draft_id
+
+# Derived indexes are rebuilt in bulk once, then kept current by the store
+if "ranking" not in st.session_state:
+    st.session_state["score_weights"] = dict(DEFAULT_WEIGHTS)
+    ranking = ScoreIndex(st.session_state["score_weights"], top_n=RANKING_TOP_N)
+    ranking.rebuild(st.session_state["target_sections"].all_cases())
+    st.session_state["target_sections"].add_listener(ranking)
+    st.session_state["ranking"] = ranking
+
+if "search_index" not in st.session_state:
+    search_index = SearchIndex()
+    search_index.rebuild(st.session_state["target_sections"].all_cases())
+    st.session_state["target_sections"].add_listener(search_index)
+    st.session_state["search_index"] = search_index
+
+if "duplicate_index" not in st.session_state:
+    duplicate_index = DuplicateIndex()
+    duplicate_index.rebuild(st.session_state["target_sections"].all_cases())
+    st.session_state["target_sections"].add_listener(duplicate_index)
+    st.session_state["duplicate_index"] = duplicate_index
+
 # Form functions
+def mark_data_changed():
+    """Record that target_sections changed so cached exports are rebuilt."""
+    st.session_state["data_version"] = st.session_state.get("data_version", 0) + 1
+    # Prepared payloads of the old version are never shown again
+    st.session_state["export_cache"].clear()
+
+def layout_signature() -> tuple:
+    """Return the data the progress tracker, leaderboard and export area depend on.
+
+    Section fragments compare this against the value recorded on the last
+    full run and only rerun the whole app when it has changed.
+    """
+    store = st.session_state["target_sections"]
+    # A data change drops prepared exports, whose download buttons must then go
+    prepared = bool(st.session_state["export_cache"])
+    return (store.sections_version, store.has_use_cases, st.session_state["ranking"].top_version, prepared)
+
+def widgets_rendered() -> int:
+    """Return how many widgets this script run has registered so far."""
+    shared = getattr(get_script_run_ctx(), "shared", None)
+    widget_ids = getattr(shared, "widget_ids_this_run", None)
+    return len(widget_ids.snapshot()) if widget_ids is not None else 0
+
+def record_session_metrics():
+    """Record the session-state footprint and widget count of this run."""
+    if not metrics.ENABLED:
+        return
+    metrics.observe("session_state_keys", len(st.session_state))
+    metrics.observe("widgets_rendered", widgets_rendered())
+
+# Session memory management
+def current_session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "bare"
+
+def shed_caches():
+    """Drop the memoized card HTML and export payloads; both rebuild on demand."""
+    st.session_state["card_html"].clear()
+    st.session_state["export_cache"].clear()
+
+def forget_cards(case_ids: set):
+    """Drop memoized card HTML for use cases that no longer exist."""
+    cache = st.session_state["card_html"]
+    for cache_key in [cache_key for cache_key in cache if cache_key[0] in case_ids]:
+        del cache[cache_key]
+
+def capacity_error(new_sections: int = 0, new_cases: int = 0) -> Optional[str]:
+    """Return why the form cannot grow by the given amounts, or None if it can."""
+    store = st.session_state["target_sections"]
+    if len(store) + new_sections > SESSION_MAX_SECTIONS:
+        return f"A form can have at most {SESSION_MAX_SECTIONS} sections."
+    if store.case_count + new_cases > SESSION_MAX_USE_CASES:
+        return f"A form can have at most {SESSION_MAX_USE_CASES} use cases."
+    report = get_session_registry().get(current_session_id())
+    if report is not None and report.total_bytes > SESSION_STATE_MAX_BYTES:
+        return "This form has reached its memory limit. Submit or export it before adding more."
+    return None
+
+def track_session_memory():
+    """Measure this session's state, at most once per SESSION_REPORT_INTERVAL."""
+    registry = get_session_registry()
+    session_id = current_session_id()
+    previous = registry.get(session_id)
+    if previous is not None and time.time() - previous.measured_at < SESSION_REPORT_INTERVAL:
+        return
+    store = st.session_state["target_sections"]
+    report = measure_session(session_id, st.session_state.to_dict(), len(store), store.case_count)
+    if report.total_bytes > SESSION_STATE_MAX_BYTES:
+        shed_caches()
+    registry.update(report)
+    metrics.observe("session_state_bytes", report.total_bytes)
+
 def reset_form_defaults(section: str):
     """Reset form fields to their default values."""
-    # Text fields
-    form_values = {
-        f"use_case_{section}": "",
-        f"description_{section}": "",
-        f"current_{section}": "",
-        f"risks_{section}": "",
-        f"compliance_{section}": "",
-        # Numeric fields
-        f"value_{section}": 5,
-        f"impact_{section}": 5,
-        # Dropdowns
-        f"feasibility_{section}": "Medium",
-        f"frequency_{section}": "Daily",
-        f"complexity_{section}": "Medium",
-        f"priority_{section}": "Medium"
-    }
-    
-    # Update session state
-    for key, value in form_values.items():
-        st.session_state[key] = value
-
-def validate_section_case(section: str) -> bool:
-    """Validate required fields for a use case in a specific section."""
-    if not st.session_state.get(f"use_case_{section}"):
-        st.error("Use Case Title is required.")
-        return False
-    if not st.session_state.get(f"description_{section}"):
-        st.error("Description is required.")
+    SCHEMA.reset(st.session_state, section)
+
+def validate_section_case(section: str, new_case: Dict) -> bool:
+    """Validate a use case entered in a specific section."""
+    errors = SCHEMA.validate(new_case)
+    if errors:
+        st.error(f"{errors[0]}.")
         return False
     return True
 
 def validate_submission() -> bool:
     """Validate all required fields before form submission."""
     required_fields = [
-        ('business_name', 'Business/Institution Name is required'),
+        ('business_name', BUSINESS_NAME_REQUIRED),
     ]
     
     for field, message in required_fields:
@@ -178,29 +266,29 @@ def validate_submission() -> bool:
             st.error(message)
             return False
             
-    if not st.session_state.get("target_sections") or len(st.session_state["target_sections"]) == 0:
-        st.error("At least one target section is required")
+    store = st.session_state["target_sections"]
+    if len(store) == 0:
+        st.error(SECTION_REQUIRED)
         return False
         
     # Check that at least one section has at least one use case
-    has_use_cases = False
-    for section, cases in st.session_state.get("target_sections", {}).items():
-        if cases and len(cases) > 0:
-            has_use_cases = True
-            break
-    
-    if not has_use_cases:
-        st.error("At least one use case is required")
+    if not store.has_use_cases:
+        st.error(USE_CASE_REQUIRED)
         return False
         
     return True
 
+@metrics.timed()
 def add_section():
     """Add a new section using the input from session state."""
     new_section = st.session_state.get("new_section", "").strip()
     if new_section:
-        if new_section not in st.session_state["target_sections"]:
-            st.session_state["target_sections"][new_section] = []
+        exists = new_section in st.session_state["target_sections"]
+        error = None if exists else capacity_error(new_sections=1)
+        if error:
+            st.error(error)
+        elif st.session_state["target_sections"].add_section(new_section):
+            mark_data_changed()
             st.session_state["success_message"] = f"Section '{new_section}' added successfully!"
             st.session_state["show_success"] = True
             st.session_state["new_section"] = ""  # Clear the input field
@@ -209,31 +297,33 @@ def add_section():
     else:
         st.error("Please enter a section name")
 
+@metrics.timed()
 def delete_section(section: str):
     """Delete a section and all its use cases."""
-    if section in st.session_state["target_sections"]:
-        del st.session_state["target_sections"][section]
-        st.session_state["success_message"] = f"Section '{section}' deleted successfully!"
+    store = st.session_state["target_sections"]
+    if section in store:
+        case_ids = {case.id for case in store.cases(section)}
+        store.delete_section(section)
+        purge_section_keys(st.session_state, section)
+        forget_cards(case_ids)
+        mark_data_changed()
+        st.session_state["success_message"] = f"Section '{section}' deleted. Use ↩️ Undo to restore it."
         st.session_state["show_success"] = True
 
+@metrics.timed()
 def add_use_case(section: str, continue_adding: bool = False):
     """Add a use case to the specified section."""
-    if validate_section_case(section):
-        new_case = {
-            "use_case": st.session_state.get(f"use_case_{section}", ""),
-            "description": st.session_state.get(f"description_{section}", ""),
-            "current_process": st.session_state.get(f"current_{section}", ""),
-            "value": st.session_state.get(f"value_{section}", 5),
-            "impact": st.session_state.get(f"impact_{section}", 5),
-            "feasibility": st.session_state.get(f"feasibility_{section}", "Medium"),
-            "frequency": st.session_state.get(f"frequency_{section}", "Daily"),
-            "complexity": st.session_state.get(f"complexity_{section}", "Medium"),
-            "risks": st.session_state.get(f"risks_{section}", ""),
-            "compliance": st.session_state.get(f"compliance_{section}", ""),
-            "priority": st.session_state.get(f"priority_{section}", "Medium"),
-        }
+    error = capacity_error(new_cases=1)
+    if error:
+        st.error(error)
+        return
+    new_case = SCHEMA.read(st.session_state, section)
+    if validate_section_case(section, new_case):
+        if hold_likely_duplicate(section, new_case):
+            return
         
-        st.session_state["target_sections"][section].append(new_case)
+        st.session_state["target_sections"].add(section, **new_case)
+        mark_data_changed()
         
         if continue_adding:
             message = f"Use Case '{new_case['use_case']}' saved! Add another..."
@@ -246,65 +336,281 @@ def add_use_case(section: str, continue_adding: bool = False):
         # Reset form fields for the next entry
         reset_form_defaults(section)
 
-def delete_use_case(section: str, idx: int):
+def hold_likely_duplicate(section: str, new_case: Dict) -> bool:
+    """Hold back a likely duplicate once so the user can review it before saving.
+
+    Saving the same title and description again confirms it.
+    """
+    warning_key = f"duplicates_{section}"
+    fingerprint = (new_case["use_case"], new_case["description"])
+    warning = st.session_state.pop(warning_key, None)
+    if warning is not None and warning[0] == fingerprint:
+        return False
+
+    store = st.session_state["target_sections"]
+    matches = [
+        f"{store.get(case_id).use_case} (📂 {store.get(case_id).section}, {score:.0%} similar)"
+        for case_id, score in st.session_state["duplicate_index"].check(*fingerprint)[:DUPLICATES_SHOWN]
+    ]
+    matches += [
+        f"{match['use_case']} (submitted earlier, {match['similarity']:.0%} similar)"
+        for match in get_storage().similar_submitted_cases(*fingerprint, limit=DUPLICATES_SHOWN)
+    ]
+    if not matches:
+        return False
+    st.session_state[warning_key] = (fingerprint, matches)
+    return True
+
+@metrics.timed()
+def delete_use_case(section: str, case_id: int):
     """Delete a specific use case from a section."""
-    if section in st.session_state["target_sections"]:
-        if 0 <= idx < len(st.session_state["target_sections"][section]):
-            st.session_state["target_sections"][section].pop(idx)
-            st.session_state["success_message"] = "Use case deleted successfully!"
-            st.session_state["show_success"] = True
+    store = st.session_state["target_sections"]
+    case = store.get(case_id)
+    if case is not None and case.section == section:
+        store.delete(case_id)
+        purge_case_keys(st.session_state, section, case_id)
+        if st.session_state.get(f"editing_{section}") == case_id:
+            stop_editing(section)
+        forget_cards({case_id})
+        mark_data_changed()
+        st.session_state["success_message"] = "Use case deleted successfully!"
+        st.session_state["show_success"] = True
+
+def start_editing(section: str, case_id: int):
+    """Load a saved use case into its section's form for editing in place."""
+    case = st.session_state["target_sections"].get(case_id)
+    if case is not None and case.section == section:
+        SCHEMA.load(st.session_state, section, case)
+        st.session_state[f"editing_{section}"] = case_id
+        st.session_state.pop(f"duplicates_{section}", None)
+
+def stop_editing(section: str):
+    """Leave edit mode and clear the section's form."""
+    st.session_state.pop(f"editing_{section}", None)
+    reset_form_defaults(section)
+
+@metrics.timed()
+def update_use_case(section: str):
+    """Save the form's values over the use case being edited."""
+    store = st.session_state["target_sections"]
+    case_id = st.session_state.get(f"editing_{section}")
+    if store.get(case_id) is None:
+        st.error("This use case no longer exists.")
+        stop_editing(section)
+        return
+    values = SCHEMA.read(st.session_state, section)
+    if validate_section_case(section, values):
+        store.update(case_id, **values)
+        forget_cards({case_id})
+        mark_data_changed()
+        st.session_state["success_message"] = f"Use Case '{values['use_case']}' updated successfully!"
+        st.session_state["show_success"] = True
+        stop_editing(section)
 
-def get_download_link(data, filename, text):
-    """Generate a download link for the given data."""
-    b64 = base64.b64encode(data.encode()).decode()
-    href = f'<a href="data:file/txt;base64,{b64}" download="{filename}">{text}</a>'
-    return href
+def step_history(redo: bool = False):
+    """Undo (or redo) the latest change to sections and use cases."""
+    store = st.session_state["target_sections"]
+    edit = store.next_redo if redo else store.next_undo
+    if edit is None:
+        st.info(f"Nothing to {'redo' if redo else 'undo'}.")
+        return
+    # Records and sections the step takes out, and how much it grows the form by
+    dropped, restored = (edit.removed, edit.added) if redo else (edit.added, edit.removed)
+    dropped_sections, restored_sections = ((edit.sections_removed, edit.sections_added) if redo
+                                           else (edit.sections_added, edit.sections_removed))
+    error = capacity_error(new_sections=len(restored_sections) - len(dropped_sections),
+                           new_cases=len(restored) - len(dropped))
+    if error:
+        st.error(error)
+        return
 
-def export_data_as_json():
-    """Export form data as JSON."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if redo:
+        store.redo()
+    else:
+        store.undo()
+    dropped_ids = {case.id for case in dropped}
+    for case in dropped:
+        purge_case_keys(st.session_state, case.section, case.id)
+        # Close a form still editing a record the step replaced or removed
+        if st.session_state.get(f"editing_{case.section}") == case.id:
+            stop_editing(case.section)
+    for section, _ in dropped_sections:
+        purge_section_keys(st.session_state, section)
+    forget_cards(dropped_ids)
+    mark_data_changed()
+    st.session_state["success_message"] = f"{'Redid' if redo else 'Undid'}: {edit.label}."
+    st.session_state["show_success"] = True
+
+@metrics.timed()
+def export_data_as_json(target_sections: UseCaseStore, business_name: str,
+                        compression: Optional[str] = None) -> bytes:
+    """Serialize form data as a compact JSON document."""
     export_data = {
-        "business_name": st.session_state.get("business_name", ""),
+        "business_name": business_name,
         "submission_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "target_sections": st.session_state.get("target_sections", {})
+        "target_sections": target_sections.to_dict()
     }
-    json_str = json.dumps(export_data, indent=2)
-    filename = f"agent_form_export_{timestamp}.json"
-    
-    return get_download_link(json_str, filename, "📥 Download JSON")
+    buffer = io.BytesIO()
+    exports.write_json(export_data, buffer, compression)
+    return buffer.getvalue()
 
-def export_data_as_csv():
-    """Export form data as CSV."""
-    rows = []
-    
-    for section, use_cases in st.session_state.get("target_sections", {}).items():
-        for case in use_cases:
-            row = {
-                "Business": st.session_state.get("business_name", ""),
-                "Section": section,
-                "Use Case": case.get("use_case", ""),
-                "Description": case.get("description", ""),
-                "Current Process": case.get("current_process", ""),
-                "Business Value": case.get("value", ""),
-                "User Impact": case.get("impact", ""),
-                "Feasibility": case.get("feasibility", ""),
-                "Frequency": case.get("frequency", ""),
-                "Complexity": case.get("complexity", ""),
-                "Risks": case.get("risks", ""),
-                "Compliance": case.get("compliance", ""),
-                "Priority": case.get("priority", "")
-            }
-            rows.append(row)
-    
-    if not rows:
-        return None
-        
-    df = pd.DataFrame(rows)
-    csv = df.to_csv(index=False)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"agent_form_export_{timestamp}.csv"
-    
-    return get_download_link(csv, filename, "📥 Download CSV")
+@metrics.timed()
+def export_data_as_rows(target_sections: UseCaseStore, business_name: str, fmt: str,
+                        compression: Optional[str] = None) -> bytes:
+    """Serialize form data in a row format (CSV, NDJSON, Parquet, ...), one row per use case."""
+    return exports.export_bytes(exports.store_rows(target_sections, business_name), fmt, compression)
+
+def form_snapshot(include_extracts: bool = False) -> Dict:
+    """Return the business name, use cases and documents as a plain, storable dict.
+
+    Submissions pass ``include_extracts`` to attach each document's extracted
+    text and tables; drafts only carry the document references.
+    """
+    documents = []
+    for ref in st.session_state["documents"].values():
+        document = ref._asdict()
+        if include_extracts:
+            document["extracted"] = get_extractor().result(ref)
+        documents.append(document)
+    return {
+        "business_name": st.session_state.get("business_name", ""),
+        "target_sections": st.session_state["target_sections"].to_dict(),
+        "documents": documents
+    }
+
+def current_export(fmt: str, compression: Optional[str] = None) -> Optional[bytes]:
+    """Return this session's prepared export of the current data, or None if it needs preparing."""
+    cached = st.session_state["export_cache"].get((fmt, compression))
+    version = (st.session_state.get("data_version", 0), st.session_state.get("business_name", ""))
+    return cached[1] if cached and cached[0] == version else None
+
+def prepare_export(fmt: str, compression: Optional[str] = None):
+    """Build an export on the script thread and memoize it on the data version and business name.
+
+    Download buttons are then given the bytes, not a deferred callable:
+    Streamlit keeps files generated by deferred callables unreferenced, so
+    the cleanup run at the end of any session's rerun can delete them before
+    the browser fetches them. Files passed as bytes stay referenced while
+    the button is on screen, at the cost of one extra click per export.
+    """
+    target_sections = st.session_state["target_sections"]
+    business_name = st.session_state.get("business_name", "")
+    if fmt == "json":
+        payload = export_data_as_json(target_sections, business_name, compression)
+    else:
+        payload = export_data_as_rows(target_sections, business_name, fmt, compression)
+    version = (st.session_state.get("data_version", 0), business_name)
+    st.session_state["export_cache"][(fmt, compression)] = (version, payload)
+
+def export_button(fmt: str, compression: Optional[str], label: str, file_name: str, mime: str):
+    """Render a "Prepare" button for an export, or its download button once it is prepared."""
+    payload = current_export(fmt, compression)
+    if payload is None:
+        st.button(f"⚙️ Prepare {label}", key=f"prepare_{fmt}", on_click=prepare_export, args=(fmt, compression))
+    else:
+        st.download_button(f"📥 Download {label}", data=payload, file_name=file_name, mime=mime,
+                           key=f"download_{fmt}", on_click="ignore")
+
+def custom_fields_html(case: UseCase) -> str:
+    """Return the card lines for deployment-specific fields (empty without any)."""
+    return "".join(
+        f"<p><strong>{escape(field.label)}:</strong> {escape(str(getattr(case, field.name)))}</p>"
+        for field in SCHEMA.custom
+    )
+
+def case_card_html(case: UseCase) -> str:
+    """Return the HTML card for a use case, memoized on its id, version and score."""
+    cache = st.session_state["card_html"]
+    score = st.session_state["ranking"].score(case.id)
+    cache_key = (case.id, case.version, score)
+    html = cache.get(cache_key)
+    if html is None:
+        html = f"""
+                    <div class='use-case-box'>
+                        <div style="display: flex; justify-content: space-between; align-items: center">
+                        <h3>{escape(case.use_case or 'Untitled Use Case')}</h3>
+                    </div>
+                    <p><strong>Description:</strong> {escape(case.description or 'No description provided')}</p>
+                    <div style="display: flex; flex-wrap: wrap; gap: 1rem; margin: 1rem 0;">
+                        <span class='metric-badge'>Value: {case.value}/10</span>
+                        <span class='metric-badge'>Impact: {case.impact}/10</span>
+                        <span class='metric-badge'>Feasibility: {escape(case.feasibility)}</span>
+                        <span class='metric-badge'>Priority: {escape(case.priority)}</span>
+                        <span class='metric-badge'>Score: {score}</span>
+                    </div>
+                    {custom_fields_html(case)}
+                </div>
+                """
+        if len(cache) >= CARD_HTML_CACHE_SIZE:
+            cache.clear()
+        cache[cache_key] = html
+    return html
+
+@metrics.timed()
+def update_score_weights():
+    """Apply the weight sliders and rescore every use case in one pass."""
+    weights = {field: st.session_state[f"weight_{field}"] for field in DEFAULT_WEIGHTS}
+    st.session_state["score_weights"] = weights
+    st.session_state["ranking"].set_weights(weights, st.session_state["target_sections"].all_cases())
+
+@metrics.timed()
+def import_use_cases():
+    """Validate an uploaded CSV/NDJSON/JSON file and insert its valid rows in one batch."""
+    uploader_key = f"bulk_import_{st.session_state['import_generation']}"
+    upload = st.session_state.get(uploader_key)
+    if upload is None:
+        st.error("Please choose a CSV, NDJSON or JSON file to import.")
+        return
+    try:
+        from bulk_import import ImportFileError, read_upload, validate
+
+        result = validate(read_upload(upload, upload.name))
+    except ImportFileError as exc:
+        st.error(str(exc))
+        return
+
+    store = st.session_state["target_sections"]
+    new_sections = sum(1 for section in result.sections if section not in store)
+    error = capacity_error(new_sections=new_sections, new_cases=result.imported)
+    if error:
+        st.error(error)
+        return
+    with store.grouped(f"import {result.imported} use cases"):
+        for section, rows in result.sections.items():
+            store.add_many(section, rows)
+    if result.sections:
+        mark_data_changed()
+
+    st.session_state["import_errors"] = result.errors if len(result.errors) else None
+    st.session_state["success_message"] = f"Imported {result.imported} of {result.total_rows} use cases."
+    st.session_state["show_success"] = True
+    st.session_state["import_generation"] += 1
+
+@metrics.timed()
+def spool_uploads():
+    """Move freshly uploaded files into the spool and release their buffers."""
+    uploader_key = f"file_uploader_{st.session_state['uploader_generation']}"
+    documents = st.session_state["documents"]
+    spool = get_spool()
+    for file in st.session_state.get(uploader_key) or []:
+        if len(documents) >= SESSION_UPLOAD_MAX_FILES:
+            st.error(f"You can attach at most {SESSION_UPLOAD_MAX_FILES} documents.")
+            break
+        try:
+            ref = spool.store(file, file.name, quota=SESSION_UPLOAD_QUOTA - session_usage(documents))
+        except QuotaExceeded as exc:
+            st.error(str(exc))
+            continue
+        documents[ref.digest] = ref
+        get_extractor().submit(ref)
+    mark_data_changed()
+    # A fresh uploader key lets Streamlit drop the in-memory upload buffers
+    st.session_state["uploader_generation"] += 1
+
+def remove_document(digest: str):
+    """Detach a spooled document from this session."""
+    if st.session_state["documents"].pop(digest, None):
+        mark_data_changed()
 
 # Callbacks for form actions
 def on_add_continue_click(section):
@@ -316,29 +622,248 @@ def on_save_click(section):
 def on_delete_section_click(section):
     delete_section(section)
 
-def on_delete_case_click(section, idx):
-    delete_use_case(section, idx)
+def on_delete_case_click(section, case_id):
+    delete_use_case(section, case_id)
 
+def on_edit_case_click(section, case_id):
+    start_editing(section, case_id)
+
+def on_save_edit_click(section):
+    update_use_case(section)
+
+def on_cancel_edit_click(section):
+    stop_editing(section)
+
+def on_undo_click():
+    step_history()
+
+def on_redo_click():
+    step_history(redo=True)
+
+def on_load_more_click(section):
+    key = f"visible_cases_{section}"
+    st.session_state[key] = st.session_state.get(key, CASES_PAGE_SIZE) + CASES_PAGE_SIZE
+
+
+# Draft autosave
+@st.fragment(run_every=AUTOSAVE_INTERVAL)
+def autosave_draft():
+    """Queue a draft save when the form changed since the last one."""
+    version = (st.session_state["data_version"], st.session_state.get("business_name", ""))
+    if version != st.session_state.get("autosaved_version"):
+        get_storage().save_draft(st.session_state["draft_id"], form_snapshot())
+        st.session_state["autosaved_version"] = version
+
+# Session memory report
+def render_session_memory():
+    """Show this session's state footprint, and to operators the largest sessions on the server."""
+    registry = get_session_registry()
+    session_id = current_session_id()
+    report = registry.get(session_id)
+    if report is not None:
+        st.caption(f"This session holds {report.total_bytes / 1024:,.0f} KB in {report.keys} keys "
+                   f"(limit {SESSION_STATE_MAX_BYTES // 1024 ** 2} MB). Largest: "
+                   + ", ".join(f"{key} ({size / 1024:,.0f} KB)" for key, size in report.largest_keys))
+    if not ADMIN_TOKEN:
+        return
+    # Other people's sessions are for operators only
+    token = st.text_input("Operator token", type="password", key="operator_token")
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        if token:
+            st.error("Invalid operator token.")
+        return
+    now = time.time()
+    rows = [
+        "| Session | Memory | Keys | Sections | Use cases | Measured |",
+        "|---|---:|---:|---:|---:|---:|",
+    ]
+    for other in registry.largest(LARGEST_SESSIONS_SHOWN):
+        label = f"{other.session_id[:8]}{' (you)' if other.session_id == session_id else ''}"
+        rows.append(f"| {label} | {other.total_bytes / 1024:,.0f} KB | {other.keys} | {other.sections} "
+                    f"| {other.use_cases} | {now - other.measured_at:.0f}s ago |")
+    st.markdown(f"**Largest of {len(registry)} sessions on this server** "
+                f"({registry.total_bytes() / 1024 ** 2:,.1f} MB total)\n\n" + "\n".join(rows))
+
+# Supporting documents grid
+@metrics.timed("documents_grid")
+def render_documents(polling: bool = False):
+    """Render the uploaded-files grid with each file's extraction progress."""
+    documents = st.session_state["documents"]
+    if not documents:
+        return
+    extractor = get_extractor()
+    statuses = {digest: extractor.status(ref) for digest, ref in documents.items()}
+    if polling and all(status["status"] != PENDING for status in statuses.values()):
+        # Everything finished; rerun the app once to drop the polling timer
+        st.rerun(scope="app")
+
+    st.markdown("**Uploaded Files:**")
+    file_cols = st.columns(3)
+    for i, ref in enumerate(list(documents.values())):
+        status = statuses[ref.digest]
+        if status["status"] == PENDING:
+            progress = "⏳ Extracting text..."
+        elif status["status"] == DONE:
+            progress = f"✅ {status['chars']:,} characters, {status['tables']} tables extracted"
+        else:
+            progress = f"⚠️ Extraction failed: {status['error']}"
+        with file_cols[i % 3]:
+            st.markdown(f"""
+            <div style="background-color: #f8f9fa; padding: 10px; border-radius: 5px; margin-bottom: 10px;">
+                <span style="font-weight: bold;">📎 {ref.name}</span><br>
+                <span style="font-size: 0.8rem; color: #6c757d;">({ref.size//1024} KB)</span><br>
+                <span style="font-size: 0.8rem; color: #6c757d;">{progress}</span>
+            </div>
+            """, unsafe_allow_html=True)
+            st.button("✖ Remove", key=f"remove_doc_{ref.digest}",
+                      on_click=remove_document, args=(ref.digest,))
+
+# Use case search
+@st.fragment
+def render_search():
+    """Search this form's use cases; reruns on its own while the user searches."""
+    store = st.session_state["target_sections"]
+    query_col, section_col, priority_col = st.columns([3, 1, 1])
+    with query_col:
+        query = st.text_input("🔎 Search use cases", key="search_query",
+                              placeholder="Words or word beginnings from any text field")
+    with section_col:
+        section = st.selectbox("Section", ["All sections", *store.sections()], key="search_section")
+    with priority_col:
+        priority = st.selectbox("Priority", ["Any priority", *LEVELS], key="search_priority")
+    if not query.strip():
+        return
+
+    with metrics.span("search"):
+        hits = st.session_state["search_index"].search(
+            query,
+            section=None if section == "All sections" else section,
+            priority=None if priority == "Any priority" else priority,
+            limit=SEARCH_RESULTS_LIMIT,
+        )
+    if not hits:
+        st.caption("No use cases match your search.")
+        return
+    st.caption(f"Top {len(hits)} matches")
+    for case_id, _ in hits:
+        case = store.get(case_id)
+        st.markdown(f"**{escape(case.use_case)}** · 📂 {escape(case.section)} · Priority: {case.priority} · "
+                    f"Value: {case.value}/10 · Impact: {case.impact}/10")
+
+# Section rendering
+@st.fragment
+def render_section(section: str, expanded: bool = True):
+    """Render one section's expander as an independently rerunnable fragment."""
+    # Adding/removing sections or the first use case changes the progress
+    # tracker and export area, which live outside this fragment
+    if layout_signature() != st.session_state.get("render_signature"):
+        st.rerun(scope="app")
+    store = st.session_state["target_sections"]
+
+    with st.expander(f"📂 {section.upper()}", expanded=expanded):
+        # Only this fragment reruns on widget interaction, so surface the
+        # callback's message here instead of at the top of the page
+        if st.session_state.get("show_success"):
+            st.success(st.session_state.get("success_message", "Operation completed successfully!"))
+            st.session_state["show_success"] = False
+
+        # Section Header with Delete Button
+        header_col, button_col = st.columns([5, 1])
+        with button_col:
+            if st.button(f"🗑️ Delete Section", key=f"del_sec_{section}", 
+                        on_click=on_delete_section_click, args=(section,)):
+                pass  # Logic handled in callback function
+        
+        # Use Case Input Fields (filled with a saved case while editing it)
+        editing = store.get(st.session_state.get(f"editing_{section}"))
+        if editing is None:
+            st.markdown("### Add New Use Case")
+        else:
+            st.markdown("### Edit Use Case")
+            st.caption(f"Editing '{editing.use_case}'. Save to update it in place.")
+        SCHEMA.seed(st.session_state, section)
+        SCHEMA.render(section, st.columns(2))
+
+        duplicates = st.session_state.get(f"duplicates_{section}")
+        if duplicates:
+            st.warning("⚠️ This looks like an existing use case:\n\n"
+                       + "\n".join(f"- {match}" for match in duplicates[1])
+                       + "\n\nSave it again to add it anyway.")
+
+        # Add Use Case Buttons
+        btn_col1, btn_col2 = st.columns([1, 1])
+        if editing is not None:
+            with btn_col1:
+                st.button("✖ Cancel", key=f"cancel_edit_{section}", use_container_width=True,
+                          on_click=on_cancel_edit_click, args=(section,))
+            with btn_col2:
+                st.button("💾 Save Changes", key=f"save_edit_{section}", use_container_width=True,
+                          type="primary", on_click=on_save_edit_click, args=(section,))
+        else:
+            with btn_col1:
+                if st.button("➕ Add & Continue", 
+                            key=f"add_another_{section}",
+                            help="Save current use case and clear form for new entry",
+                            use_container_width=True,
+                            on_click=on_add_continue_click, args=(section,)):
+                    pass  # Logic handled in callback function
+
+            with btn_col2:
+                if st.button(f"💾 Save Use Case", 
+                            key=f"add_case_{section}",
+                            help="Save and finalize current use case",
+                            use_container_width=True,
+                            type="primary",
+                            on_click=on_save_click, args=(section,)):
+                    pass  # Logic handled in callback function
+
+        # Display Existing Use Cases (windowed so rerun cost tracks what is visible)
+        total_cases = store.section_size(section)
+        if total_cases:
+            st.markdown("#### Existing Use Cases")
+            visible = st.session_state.get(f"visible_cases_{section}", CASES_PAGE_SIZE)
+            if st.toggle("Sort by score", key=f"sort_by_score_{section}"):
+                ranked_ids = st.session_state["ranking"].section_order(section)
+                cases = (store.get(case_id) for case_id in islice(ranked_ids, visible))
+            else:
+                cases = islice(store.cases(section), visible)
+            with metrics.span("case_cards"):
+                for case in cases:
+                    with st.container():
+                        st.markdown(case_card_html(case), unsafe_allow_html=True)
+                        
+                        # Server-side edit and delete buttons
+                        edit_col, delete_col, _ = st.columns([1, 1, 4])
+                        with edit_col:
+                            st.button("✏️ Edit", key=f"edit_case_{section}_{case.id}",
+                                      on_click=on_edit_case_click, args=(section, case.id))
+                        with delete_col:
+                            if st.button("Delete Use Case", key=f"del_case_{section}_{case.id}", 
+                                        on_click=on_delete_case_click, args=(section, case.id)):
+                                pass  # Logic handled in callback function
+
+            remaining = total_cases - visible
+            if remaining > 0:
+                st.button(f"⬇️ Load more ({remaining} remaining)",
+                          key=f"more_cases_{section}",
+                          on_click=on_load_more_click, args=(section,))
 
 # Create layout with a progress column on the left and main content on the right
 progress_col, main_col = st.columns([1, 18])
 
 # Progress tracker calculation
+progress_span = metrics.span("progress").start()
 total_steps = 3
 completed_steps = 0
 
 if st.session_state.get("business_name"):
     completed_steps += 1
-if st.session_state.get("target_sections") and len(st.session_state["target_sections"]) > 0:
+if len(st.session_state["target_sections"]) > 0:
     completed_steps += 1
     
     # Check for at least one use case
-    has_use_cases = False
-    for section, cases in st.session_state.get("target_sections", {}).items():
-        if cases and len(cases) > 0:
-            has_use_cases = True
-            completed_steps += 1
-            break
+    if st.session_state["target_sections"].has_use_cases:
+        completed_steps += 1
 
 # Progress percentage calculation
 progress_percentage = (completed_steps / total_steps) * 100
@@ -362,6 +887,7 @@ with progress_col:
             """, 
             unsafe_allow_html=True
         )
+progress_span.stop()
 
 # Main content column
 with main_col:
@@ -371,11 +897,11 @@ with main_col:
         st.session_state["show_success"] = False
 
     # Form header
-    st.markdown("<h1 style='text-align: center; color: black;'> 🤖 Agent Form </h1>", unsafe_allow_html=True)
+    st.markdown(HEADER_HTML, unsafe_allow_html=True)
 
     # Welcome message on first load (only shows once)
     if st.session_state.get("show_welcome") and not st.session_state.get("welcome_shown"):
-        st.info("👋 Welcome to the Agent Form! Use this tool to document use cases across your organization. So we can build you an AI Agents that better fit your needs!")
+        st.info(WELCOME_TEXT)
         st.session_state["welcome_shown"] = True
 
     # Business Information Section
@@ -385,6 +911,7 @@ with main_col:
         help="Enter the full legal name (No abbreviations)", 
         key="business_name"
     )
+    st.caption("Your progress is saved automatically. Bookmark this page to resume it later.")
 
     # Target Section Management
     st.subheader("Target Sections", help="Define departments or business areas")
@@ -400,123 +927,82 @@ with main_col:
         if st.button("➕ Add Section", use_container_width=True, on_click=add_section):
             pass  # Logic handled in callback function
 
+    # Undo/redo of section and use case changes
+    undo_col, redo_col, _ = st.columns([1, 1, 4])
+    with undo_col:
+        st.button("↩️ Undo", key="undo", use_container_width=True, on_click=on_undo_click,
+                  help="Undo the last change to sections and use cases")
+    with redo_col:
+        st.button("↪️ Redo", key="redo", use_container_width=True, on_click=on_redo_click,
+                  help="Redo the last undone change")
+
+    with st.expander("📥 Bulk Import Use Cases"):
+        st.caption("Upload a CSV, NDJSON or JSON file in the same layout as the export. "
+                   "Rows that fail validation are listed below and skipped.")
+        st.file_uploader(
+            "Import file",
+            type=IMPORT_TYPES,
+            key=f"bulk_import_{st.session_state['import_generation']}",
+            label_visibility="collapsed"
+        )
+        st.button("📥 Import", key="bulk_import_button", on_click=import_use_cases)
+        if st.session_state.get("import_errors") is not None:
+            st.warning(f"Skipped rows with errors ({len(st.session_state['import_errors'])}):")
+            st.dataframe(st.session_state["import_errors"], hide_index=True)
+
+    if st.session_state["target_sections"].has_use_cases:
+        render_search()
+
     # Display a message if no sections exist
     if not st.session_state["target_sections"]:
         st.info("No sections added yet. Please add at least one section to continue.")
 
     # Section Display and Use Case Management
-    for section, use_cases in list(st.session_state["target_sections"].items()):
-        with st.expander(f"📂 {section.upper()}", expanded=True):
-            # Section Header with Delete Button
-            header_col, button_col = st.columns([5, 1])
-            with button_col:
-                if st.button(f"🗑️ Delete Section", key=f"del_sec_{section}", 
-                            on_click=on_delete_section_click, args=(section,)):
-                    pass  # Logic handled in callback function
-            
-            # Use Case Input Fields
-            st.markdown("### Add New Use Case")
-            use_case_cols = st.columns(2)
-            with use_case_cols[0]:
-                st.markdown('<p class="required-field">Use Case Title</p>', unsafe_allow_html=True)
-                st.text_input("", key=f"use_case_{section}", label_visibility="collapsed")
-                
-                st.markdown('<p class="required-field">Description</p>', unsafe_allow_html=True)
-                st.text_area("", key=f"description_{section}", label_visibility="collapsed")
-                
-                st.text_area("Current Process", key=f"current_{section}", 
-                            help="Describe how this process is currently handled")
-            with use_case_cols[1]:
-                st.slider("Business Value (1-10)", 1, 10, key=f"value_{section}", 
-                         help="How valuable is this to the business?")
-                st.slider("User Impact (1-10)", 1, 10, key=f"impact_{section}", 
-                          help="How much will this impact users?")
-                st.selectbox("Feasibility", ["High", "Medium", "Low"], 
-                            index=1, key=f"feasibility_{section}", 
-                            help="How feasible is this to implement?")
-                st.selectbox("Frequency", ["Daily", "Weekly", "Monthly", "Quarterly", "Rarely"], 
-                            index=0, key=f"frequency_{section}", 
-                            help="How often is this process performed?")
-            
-                st.selectbox("Complexity", ["High", "Medium", "Low"], 
-                            index=1, key=f"complexity_{section}", 
-                            help="How complex is this use case?")
-                st.text_area("Risks & Dependencies", key=f"risks_{section}", 
-                            help="List any risks or dependencies for this use case")
-                with use_case_cols[0]:
-                    st.text_area("Compliance Requirements", key=f"compliance_{section}", 
-                                help="List any compliance or regulatory requirements")
-                    st.selectbox("Priority", ["High", "Medium", "Low"], 
-                                index=1, key=f"priority_{section}", 
-                                help="What is the priority level?")
-
-            # Add Use Case Buttons
-            btn_col1, btn_col2 = st.columns([1, 1])
-            with btn_col1:
-                if st.button("➕ Add & Continue", 
-                            key=f"add_another_{section}",
-                            help="Save current use case and clear form for new entry",
-                            use_container_width=True,
-                            on_click=on_add_continue_click, args=(section,)):
-                    pass  # Logic handled in callback function
+    st.session_state["render_signature"] = layout_signature()
+    with metrics.span("sections"):
+        for position, section in enumerate(st.session_state["target_sections"].sections()):
+            render_section(section, expanded=position < EXPANDED_SECTIONS_LIMIT)
 
-            with btn_col2:
-                if st.button(f"💾 Save Use Case", 
-                            key=f"add_case_{section}",
-                            help="Save and finalize current use case",
-                            use_container_width=True,
-                            type="primary",
-                            on_click=on_save_click, args=(section,)):
-                    pass  # Logic handled in callback function
-
-            # Display Existing Use Cases
-            if use_cases:
-                st.markdown("#### Existing Use Cases")
-                for idx, case in enumerate(use_cases):
-                    with st.container():
-                        st.markdown(f"""
-                        <div class='use-case-box'>
-                            <div style="display: flex; justify-content: space-between; align-items: center">
-                            <h3>{case.get('use_case', 'Untitled Use Case')}</h3>
-                        </div>
-                        <p><strong>Description:</strong> {case.get('description', 'No description provided')}</p>
-                        <div style="display: flex; flex-wrap: wrap; gap: 1rem; margin: 1rem 0;">
-                            <span class='metric-badge'>Value: {case.get('value', 'N/A')}/10</span>
-                            <span class='metric-badge'>Impact: {case.get('impact', 'N/A')}/10</span>
-                            <span class='metric-badge'>Feasibility: {case.get('feasibility', 'N/A')}</span>
-                            <span class='metric-badge'>Priority: {case.get('priority', 'N/A')}</span>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                        
-                        # Server-side delete button
-                        delete_col, _ = st.columns([1, 5])
-                        with delete_col:
-                            if st.button("Delete Use Case", key=f"del_case_{section}_{idx}", 
-                                        on_click=on_delete_case_click, args=(section, idx)):
-                                pass  # Logic handled in callback function
+    # Prioritized Use Cases
+    if st.session_state["target_sections"].has_use_cases:
+        st.markdown("## 🏆 Top Use Cases", help="Ranked by a weighted composite score (0-100)")
+        with st.expander("⚖️ Scoring Weights"):
+            weight_cols = st.columns(len(DEFAULT_WEIGHTS))
+            for col, (field, weight) in zip(weight_cols, st.session_state["score_weights"].items()):
+                with col:
+                    st.number_input(field.replace("_", " ").title(), min_value=0.0, max_value=1.0,
+                                    value=float(weight), step=0.05, key=f"weight_{field}",
+                                    on_change=update_score_weights)
+        store = st.session_state["target_sections"]
+        ranking = st.session_state["ranking"]
+        leaders = [store.get(case_id) for case_id in ranking.top()]
+        st.dataframe(
+            {
+                "Rank": list(range(1, len(leaders) + 1)),
+                "Section": [case.section for case in leaders],
+                "Use Case": [case.use_case for case in leaders],
+                "Score": [ranking.score(case.id) for case in leaders],
+            },
+            hide_index=True
+        )
 
     # File Upload Section
     st.markdown("## Supporting Documents", help="Upload relevant files for reference")
-    uploaded_files = st.file_uploader(
+    st.file_uploader(
         "Upload relevant documents",
-        type=["pdf", "docx", "txt", "csv", "xlsx", "pptx"],
+        type=DOCUMENT_TYPES,
         accept_multiple_files=True,
-        key="file_uploader",
+        key=f"file_uploader_{st.session_state['uploader_generation']}",
+        on_change=spool_uploads,
         help="Accepted formats: PDF, DOCX, TXT, CSV, XLSX, PPTX"
     )
 
-    if uploaded_files:
-        st.markdown("**Uploaded Files:**")
-        file_cols = st.columns(3)
-        for i, file in enumerate(uploaded_files):
-            with file_cols[i % 3]:
-                st.markdown(f"""
-                <div style="background-color: #f8f9fa; padding: 10px; border-radius: 5px; margin-bottom: 10px;">
-                    <span style="font-weight: bold;">📎 {file.name}</span><br>
-                    <span style="font-size: 0.8rem; color: #6c757d;">({file.size//1024} KB)</span>
-                </div>
-                """, unsafe_allow_html=True)
+    documents = st.session_state["documents"]
+    if documents:
+        # Poll on a timer only while some document is still being extracted
+        extractor = get_extractor()
+        polling = any(extractor.status(ref)["status"] == PENDING for ref in documents.values())
+        st.fragment(render_documents, run_every=EXTRACTION_POLL_INTERVAL if polling else None)(polling)
 
     # Form Submission and Export
     st.markdown("---")
@@ -525,21 +1011,52 @@ with main_col:
     with submit_col:
         if st.button("📤 Submit Form", use_container_width=True, type="primary"):
             if validate_submission():
-                st.session_state["submission_complete"] = True
-                st.success("Form submitted successfully!")
-                st.balloons()
+                saved = get_storage().save_submission(st.session_state["draft_id"],
+                                                      form_snapshot(include_extracts=True))
+                try:
+                    # Only report success once the writer thread has committed it
+                    saved.result(timeout=SUBMIT_TIMEOUT)
+                except Exception:
+                    st.error("Your submission could not be saved. Your answers are kept; please try again.")
+                else:
+                    st.session_state["autosaved_version"] = (
+                        st.session_state["data_version"], st.session_state.get("business_name", "")
+                    )
+                    st.session_state["submission_complete"] = True
+                    st.success("Form submitted successfully!")
+                    st.balloons()
 
     with export_col:
-        if st.session_state.get("target_sections") and any(st.session_state["target_sections"].values()):
-            export_tabs = st.tabs(["JSON", "CSV"])
+        if st.session_state["target_sections"].has_use_cases:
+            stem = f"agent_form_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            row_formats = exports.available_formats()
+            export_tabs = st.tabs(["JSON"] + [exports.FORMATS[fmt].label for fmt in row_formats])
             with export_tabs[0]:
-                json_link = export_data_as_json()
-                st.markdown(json_link, unsafe_allow_html=True)
-            with export_tabs[1]:
-                csv_link = export_data_as_csv()
-                if csv_link:
-                    st.markdown(csv_link, unsafe_allow_html=True)
-                else:
-                    st.info("No data to export yet.")
+                compression = st.selectbox("Compression", ["None"] + exports.available_compressions(),
+                                           key="compression_json")
+                compression = None if compression == "None" else compression
+                export_button("json", compression, "JSON",
+                              f"{stem}.json" + (exports.COMPRESSORS[compression][0] if compression else ""),
+                              exports.COMPRESSED_MIME[compression] if compression else "application/json")
+            for fmt, tab in zip(row_formats, export_tabs[1:]):
+                with tab:
+                    codecs = exports.compressions_for(fmt)
+                    compression = None
+                    if codecs:
+                        compression = st.selectbox("Compression", ["None"] + codecs, key=f"compression_{fmt}")
+                        compression = None if compression == "None" else compression
+                    export_button(fmt, compression, exports.FORMATS[fmt].label,
+                                  exports.file_name(stem, fmt, compression), exports.mime_type(fmt, compression))
         else:
             st.info("Add sections and use cases to enable data export.")
+
+    # Session memory, measured before rendering so the report is current
+    track_session_memory()
+    with st.expander("🧠 Session Memory"):
+        render_session_memory()
+
+# Draft autosave runs on its own timer, outside the main rerun
+autosave_draft()
+
+script_span.stop()
+record_session_metrics()
@@ -0,0 +1,38 @@
+"""Constant page assets, built once per server process.
+
+Streamlit re-executes app.py on every rerun, but imported modules stay
+cached, so the stylesheet is read and minified here once and the static
+markup and option lists below are never rebuilt per rerun.
+"""
+import os
+import re
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STYLESHEET_PATH = os.path.join(STATIC_DIR, "style.css")
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and redundant whitespace from a stylesheet."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+def load_stylesheet(path: str = STYLESHEET_PATH) -> str:
+    """Return the stylesheet minified and wrapped in a ``<style>`` tag."""
+    with open(path, encoding="utf-8") as handle:
+        return f"<style>{minify_css(handle.read())}</style>"
+
+
+STYLE_HTML = load_stylesheet()
+
+HEADER_HTML = "<h1 style='text-align: center; color: black;'> 🤖 Agent Form </h1>"
+WELCOME_TEXT = (
+    "👋 Welcome to the Agent Form! Use this tool to document use cases across your organization. "
+    "So we can build you an AI Agents that better fit your needs!"
+)
+
+# Accepted upload types
+DOCUMENT_TYPES = ["pdf", "docx", "txt", "csv", "xlsx", "pptx"]
+IMPORT_TYPES = ["csv", "ndjson", "json"]
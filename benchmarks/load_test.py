@@ -0,0 +1,716 @@
+"""Concurrent-session load test for app.py over Streamlit's websocket protocol.
+
+Starts ``streamlit run app.py`` (or attaches to a running server) and drives
+many simulated browser sessions against it at once. Each simulated user
+opens the page and fills in the form the way the browser would: types a
+business name, adds sections, types use cases and saves them with "Add &
+Continue", uploads a supporting document and downloads an export. Widget
+changes are sent as the same rerun requests the frontend sends, including
+fragment-scoped reruns and the timers of ``run_every`` fragments, and
+uploads and downloads go through the same HTTP endpoints.
+
+Concurrency is stepped through ``--sessions``. At each level that many
+users run the script back to back for ``--duration`` seconds, each
+finished user being replaced by a new connection. Reported per level:
+actions and reruns per second, p50/p95/p99/max rerun latency as the client
+sees it (send to ``script_finished``, so it includes queueing in the
+server), errors, server CPU, server RSS and RSS growth per connected
+session. When the harness starts the server it also enables the app's
+metrics, so the server-side script time and ``session_state_bytes``
+measured by the app are shown next to them. The first level whose p95
+exceeds ``--slo-ms`` or that pins the server at a full core is reported as
+the saturation point.
+
+Every simulated user types distinct, randomly drawn words, so each save is
+a real save rather than the app's duplicate warning. If the app shows an
+error or a warning, or a save or a card goes missing, the run still
+reports its numbers but exits with status 1, because those timings do not
+measure the intended scenario.
+
+CPU and memory are read from /proc, so they are only available on Linux,
+for a server started by the harness or named with ``--pid``. Run the
+harness on a different core than the server; it is mostly idle, but at a
+few hundred sessions its own protobuf parsing is not free.
+
+The harness needs the websockets package on top of the app's requirements:
+
+    pip install -r benchmarks/requirements.txt
+
+Usage:
+    python benchmarks/load_test.py                                  # 10,50,100,200 sessions
+    python benchmarks/load_test.py --sessions 5,20 --duration 30 --think 0.5
+    python benchmarks/load_test.py --url http://127.0.0.1:8501 --pid 1234
+    python benchmarks/load_test.py --save load_test.json
+"""
+import argparse
+import asyncio
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import websockets
+from streamlit.proto.Alert_pb2 import Alert
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+
+DEFAULT_SESSIONS = "10,50,100,200"
+RERUN_TIMEOUT = 60.0  # Seconds before a rerun counts as failed
+STARTUP_TIMEOUT = 60.0
+SAMPLE_INTERVAL = 0.5  # Seconds between /proc samples
+SATURATED_CPU = 95.0  # Percent of one core
+UPLOAD_BYTES = 16 * 1024
+CASES_PAGE_SIZE = 10  # app.CASES_PAGE_SIZE: cards shown per section before "Load more"
+FINISHED = (
+    ForwardMsg.FINISHED_SUCCESSFULLY,
+    ForwardMsg.FINISHED_FRAGMENT_RUN_SUCCESSFULLY,
+    ForwardMsg.FINISHED_WITH_COMPILE_ERROR,
+)
+
+
+# Made-up words the simulated users type. Every use case draws its own
+# random words, so no two are near-duplicates to the app's MinHash check.
+_words = random.Random(20240611)
+VOCABULARY = ["".join(_words.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_words.randint(4, 9)))
+              for _ in range(5000)]
+
+
+class RerunFailed(Exception):
+    """Raised when a rerun times out, the connection drops or the app shows an exception."""
+
+
+class ScenarioFailed(RerunFailed):
+    """Raised when the app does not do what the scenario expects, e.g. an error or a missing save."""
+
+
+# Simulated browser session
+class Session:
+    """One browser tab: a websocket, the widgets on screen and the state the frontend would send."""
+
+    def __init__(self, base_url: str, xsrf: str, stats: "LevelStats"):
+        self.base_url = base_url
+        self.xsrf = xsrf
+        self.stats = stats
+        self.ws = None
+        self.session_id = ""
+        self.page_script_hash = ""
+        self.widgets: Dict[str, Tuple[str, str, object]] = {}  # key or label -> (id, fragment id, proto)
+        self.states: Dict[str, WidgetState] = {}  # Widget id -> value the frontend holds
+        self.auto_reruns: Dict[str, List[float]] = {}  # Fragment id -> [interval, next due]
+        self.alerts: List[Tuple[int, str]] = []  # (Alert.Format, body) shown by the last run
+        self._cache: Dict[str, ForwardMsg] = {}
+        self._finished: Optional[asyncio.Future] = None
+        self._responses: Dict[str, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def _headers(self) -> Dict[str, str]:
+        parsed = urlparse(self.base_url)
+        return {"Origin": f"{parsed.scheme}://{parsed.netloc}", "Cookie": f"_streamlit_xsrf={self.xsrf}"}
+
+    async def connect(self):
+        ws_url = urljoin(self.base_url.replace("http", "ws", 1), "_stcore/stream")
+        self.ws = await websockets.connect(ws_url, subprotocols=["streamlit", self.xsrf],
+                                           additional_headers=self._headers(), max_size=None)
+        self._reader = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self.ws is not None:
+            await self.ws.close()
+
+    # Incoming messages
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                message = ForwardMsg()
+                message.ParseFromString(raw)
+                self._handle(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            failure = RerunFailed("connection closed")
+            for waiter in [self._finished, *self._responses.values()]:
+                if waiter is not None and not waiter.done():
+                    waiter.set_exception(failure)
+
+    def _handle(self, message: ForwardMsg):
+        if message.metadata.cacheable:
+            self._cache[message.hash] = message
+        kind = message.WhichOneof("type")
+        if kind == "ref_hash":
+            message = self._cache.get(message.ref_hash, message)
+            kind = message.WhichOneof("type")
+
+        if kind == "new_session":
+            self.session_id = message.new_session.initialize.session_id
+            self.page_script_hash = message.new_session.page_script_hash
+        elif kind == "delta" and message.delta.WhichOneof("type") == "new_element":
+            self._element(message.delta.new_element, message.delta.fragment_id)
+        elif kind == "script_finished":
+            if message.script_finished in FINISHED and self._finished is not None and not self._finished.done():
+                self._finished.set_result(message.script_finished)
+        elif kind == "auto_rerun":
+            interval = message.auto_rerun.interval
+            self.auto_reruns[message.auto_rerun.fragment_id] = [interval, time.monotonic() + interval]
+        elif kind == "stop_auto_rerun":
+            for fragment_id in message.stop_auto_rerun.fragment_ids:
+                self.auto_reruns.pop(fragment_id, None)
+        elif kind == "file_urls_response":
+            waiter = self._responses.pop(message.file_urls_response.response_id, None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(message.file_urls_response)
+
+    def _element(self, element, fragment_id: str):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.stats.app_errors += 1
+            return
+        if kind == "alert":
+            self.alerts.append((element.alert.format, element.alert.body))
+            return
+        proto = getattr(element, kind)
+        widget_id = getattr(proto, "id", "")
+        if not widget_id:
+            return
+        # Widget ids are "$$ID-<hash>-<key>", with "None" as the key of unkeyed widgets
+        key = widget_id.split("-", 2)[2] if widget_id.startswith("$$ID-") else widget_id
+        entry = (widget_id, fragment_id, proto)
+        if key != "None":
+            self.widgets[key] = entry
+        if getattr(proto, "label", ""):
+            self.widgets[proto.label] = entry
+        # A value set by the app (e.g. a field cleared by a callback) replaces what the frontend holds
+        if getattr(proto, "set_value", False) and kind in ("text_input", "text_area") and widget_id in self.states:
+            self.states[widget_id].string_value = proto.value
+
+    def expect_saved(self):
+        """Fail unless the last run confirmed a save without a duplicate warning."""
+        if any(alert_format == Alert.WARNING for alert_format, _ in self.alerts):
+            raise ScenarioFailed("duplicate warning instead of a save")
+        if not any(alert_format == Alert.SUCCESS and "saved" in body for alert_format, body in self.alerts):
+            raise ScenarioFailed("use case not saved")
+
+    def cards(self, section: str) -> int:
+        """Return how many use case cards of ``section`` have been on screen (one delete button each)."""
+        prefix = f"del_case_{section}_"
+        return sum(1 for key in self.widgets if key.startswith(prefix) and key[len(prefix):].isdigit())
+
+    def widget(self, name: str) -> Tuple[str, str, object]:
+        """Return a widget on screen by key, key prefix or label."""
+        if name in self.widgets:
+            return self.widgets[name]
+        for key, entry in self.widgets.items():
+            if key.startswith(name):
+                return entry
+        raise RerunFailed(f"widget {name!r} is not on screen")
+
+    # Outgoing messages
+    async def rerun(self, action: str, fragment_id: str = "", triggers: List[WidgetState] = ()) -> float:
+        """Send the frontend's widget state and wait for the run to finish; return the latency in ms."""
+        async with self._lock:
+            message = BackMsg()
+            client_state = message.rerun_script
+            client_state.query_string = ""
+            client_state.page_script_hash = self.page_script_hash
+            client_state.fragment_id = fragment_id
+            client_state.widget_states.widgets.extend([*self.states.values(), *triggers])
+            self._finished = asyncio.get_running_loop().create_future()
+            self.alerts = []
+            started = time.perf_counter()
+            try:
+                await self.ws.send(message.SerializeToString())
+                await asyncio.wait_for(self._finished, RERUN_TIMEOUT)
+            except asyncio.TimeoutError:
+                raise RerunFailed(f"{action} timed out") from None
+            except websockets.ConnectionClosed:
+                raise RerunFailed("connection closed") from None
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.record(action, elapsed_ms)
+        errors = [body for alert_format, body in self.alerts if alert_format == Alert.ERROR]
+        if errors:
+            raise ScenarioFailed(f"app error: {errors[0]}")
+        return elapsed_ms
+
+    async def request(self, message: BackMsg, request_id: str):
+        waiter = self._responses[request_id] = asyncio.get_running_loop().create_future()
+        await self.ws.send(message.SerializeToString())
+        try:
+            return await asyncio.wait_for(waiter, RERUN_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise RerunFailed("request timed out") from None
+
+    # User actions
+    async def open(self):
+        await self.rerun("open")
+
+    async def type(self, name: str, text: str):
+        widget_id, fragment_id, _ = self.widget(name)
+        state = self.states.setdefault(widget_id, WidgetState(id=widget_id))
+        state.string_value = text
+        await self.rerun("type", fragment_id)
+
+    async def click(self, name: str):
+        widget_id, fragment_id, _ = self.widget(name)
+        await self.rerun("click", fragment_id, [WidgetState(id=widget_id, trigger_value=True)])
+
+    async def upload(self, name: str, file_name: str, data: bytes):
+        """Upload one file the way the file uploader does, then rerun with it attached."""
+        widget_id, fragment_id, _ = self.widget(name)
+        started = time.perf_counter()
+        request_id = uuid.uuid4().hex
+        message = BackMsg()
+        message.file_urls_request.request_id = request_id
+        message.file_urls_request.session_id = self.session_id
+        message.file_urls_request.file_names.append(file_name)
+        response = await self.request(message, request_id)
+        if response.error_msg:
+            raise RerunFailed(f"upload refused: {response.error_msg}")
+        urls = response.file_urls[0]
+        await asyncio.to_thread(self._put_file, urljoin(self.base_url, urls.upload_url), file_name, data)
+
+        state = self.states.setdefault(widget_id, WidgetState(id=widget_id))
+        info = state.file_uploader_state_value.uploaded_file_info.add()
+        info.name, info.size, info.file_id = file_name, len(data), urls.file_id
+        info.file_urls.CopyFrom(urls)
+        await self.rerun("upload", fragment_id)
+        self.stats.record("upload_total", (time.perf_counter() - started) * 1000)
+
+    def _put_file(self, url: str, file_name: str, data: bytes):
+        boundary = uuid.uuid4().hex
+        body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{file_name}"\r\n'
+                f"Content-Type: text/plain\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        request = urllib.request.Request(url, data=body, method="PUT", headers={
+            **self._headers(),
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "X-Xsrftoken": self.xsrf,
+        })
+        with urllib.request.urlopen(request, timeout=RERUN_TIMEOUT) as response:
+            response.read()
+
+    async def download(self, fmt: str) -> int:
+        """Prepare an export, then fetch the file its download button links to. Returns its size."""
+        started = time.perf_counter()
+        await self.click(f"prepare_{fmt}")
+        _, _, proto = self.widget(f"download_{fmt}")
+        size = await asyncio.to_thread(self._get, urljoin(self.base_url, proto.url))
+        self.stats.record("download", (time.perf_counter() - started) * 1000)
+        return size
+
+    def _get(self, url: str) -> int:
+        request = urllib.request.Request(url, headers=self._headers())
+        with urllib.request.urlopen(request, timeout=RERUN_TIMEOUT) as response:
+            return len(response.read())
+
+    async def think(self, seconds: float):
+        """Pause like a user would, firing due ``run_every`` fragment reruns meanwhile."""
+        deadline = time.monotonic() + seconds
+        while True:
+            now = time.monotonic()
+            due = [(timer[1], fragment_id) for fragment_id, timer in self.auto_reruns.items()]
+            next_due, fragment_id = min(due) if due else (deadline, "")
+            if next_due >= deadline:
+                await asyncio.sleep(max(0.0, deadline - now))
+                return
+            await asyncio.sleep(max(0.0, next_due - now))
+            timer = self.auto_reruns.get(fragment_id)
+            if timer is not None:
+                timer[1] = time.monotonic() + timer[0]
+                await self.rerun("auto_rerun", fragment_id)
+
+
+# Scenario
+async def fill_in_form(session: Session, user: int, sections: int, cases: int, think: float):
+    """The script one simulated user follows, from opening the page to downloading an export."""
+    def pause():
+        return session.think(think * random.uniform(0.5, 1.5))
+
+    await session.open()
+    await pause()
+    await session.type("business_name", f"Load Test {user}")
+    for section_number in range(sections):
+        section = f"Section {section_number + 1}"
+        await pause()
+        await session.type("new_section", section)
+        await session.click("➕ Add Section")
+        for case_number in range(cases):
+            words = random.Random(f"{user}.{section_number}.{case_number}")
+            await pause()
+            await session.type(f"use_case_{section}", " ".join(words.sample(VOCABULARY, 4)).capitalize())
+            await pause()
+            await session.type(f"description_{section}", " ".join(words.sample(VOCABULARY, 12)).capitalize())
+            await session.click(f"add_another_{section}")
+            session.expect_saved()
+        if session.cards(section) != min(cases, CASES_PAGE_SIZE):
+            raise ScenarioFailed(f"cards missing: {session.cards(section)} of {cases} in {section}")
+    await pause()
+    await session.upload("file_uploader_", f"notes_{user}.txt", os.urandom(UPLOAD_BYTES // 2).hex().encode())
+    await pause()
+    await session.download("json")
+    await pause()
+
+
+# Measurements
+class LevelStats:
+    """Latencies and counts collected at one concurrency level."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.app_errors = 0
+        self.scenario_failures = 0
+        self.users_finished = 0
+
+    def record(self, action: str, elapsed_ms: float):
+        self.latencies.setdefault(action, []).append(elapsed_ms)
+
+    def error(self, reason: str):
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def reruns(self) -> List[float]:
+        return [sample for action, samples in self.latencies.items()
+                if action not in ("upload_total", "download") for sample in samples]
+
+
+class ProcessSampler:
+    """Samples a process's CPU use and resident memory from /proc."""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self.available = pid is not None and os.path.exists(f"/proc/{pid}/stat")
+        self.cpu: List[float] = []
+        self.rss: List[int] = []
+        self._ticks = os.sysconf("SC_CLK_TCK") if self.available else 1
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as handle:
+            # Fields after the parenthesized command name; utime and stime are the 12th and 13th
+            fields = handle.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self._ticks
+
+    def rss_bytes(self) -> int:
+        with open(f"/proc/{self.pid}/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        return 0
+
+    async def run(self, stop: asyncio.Event):
+        if not self.available:
+            return
+        last_cpu, last_time = self.cpu_seconds(), time.monotonic()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), SAMPLE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            cpu, now = self.cpu_seconds(), time.monotonic()
+            self.cpu.append((cpu - last_cpu) / (now - last_time) * 100)
+            self.rss.append(self.rss_bytes())
+            last_cpu, last_time = cpu, now
+
+
+def server_metrics(metrics_url: Optional[str]) -> Dict[str, Tuple[int, float]]:
+    """Return (count, sum) per histogram (or span) the app exports, summed over other labels."""
+    if not metrics_url:
+        return {}
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=10) as response:
+            document = json.load(response)
+    except OSError:
+        return {}  # The app starts its exporter on its first run
+    totals: Dict[str, Tuple[int, float]] = {}
+    for histogram in document["histograms"]:
+        # Spans share one histogram, told apart by their "span" label
+        name = histogram["labels"].get("span", histogram["name"])
+        count, total = totals.get(name, (0, 0.0))
+        totals[name] = (count + histogram["count"], total + histogram["sum"])
+    return totals
+
+
+def mean_between(before: Dict, after: Dict, name: str) -> Optional[float]:
+    count = after.get(name, (0, 0.0))[0] - before.get(name, (0, 0.0))[0]
+    if count <= 0:
+        return None
+    return (after[name][1] - before.get(name, (0, 0.0))[1]) / count
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Driver
+def xsrf_token(base_url: str) -> str:
+    """Fetch the XSRF cookie the server hands out to every page load."""
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    with opener.open(urljoin(base_url, "_stcore/health"), timeout=10) as response:
+        response.read()
+    return next((cookie.value for cookie in jar if cookie.name == "_streamlit_xsrf"), "")
+
+
+async def simulated_user(base_url: str, xsrf: str, stats: LevelStats, user_numbers, deadline: float,
+                         start_delay: float, args: argparse.Namespace, connected: List[int]):
+    """Run the scenario with fresh connections until the level's time is up."""
+    await asyncio.sleep(start_delay)
+    while time.monotonic() < deadline:
+        session = Session(base_url, xsrf, stats)
+        try:
+            await session.connect()
+            connected[0] += 1
+            remaining = deadline - time.monotonic()
+            await asyncio.wait_for(fill_in_form(session, next(user_numbers), args.sections_per_user,
+                                                args.cases_per_section, args.think), remaining)
+            stats.users_finished += 1
+        except asyncio.TimeoutError:
+            pass  # The level ended mid-script
+        except ScenarioFailed as exc:
+            stats.scenario_failures += 1
+            stats.error(str(exc).split(":")[0])
+        except RerunFailed as exc:
+            stats.error(str(exc).split(":")[0])
+        except urllib.error.HTTPError as exc:
+            stats.error(f"HTTP {exc.code} from {urlparse(exc.url).path.split('/')[1]}")
+        except (OSError, websockets.WebSocketException) as exc:
+            stats.error(type(exc).__name__)
+        finally:
+            if session.ws is not None:
+                connected[0] -= 1
+            await session.close()
+
+
+async def run_level(sessions: int, base_url: str, sampler: ProcessSampler, metrics_url: Optional[str],
+                    user_numbers, args: argparse.Namespace) -> Dict:
+    stats = LevelStats()
+    xsrf = await asyncio.to_thread(xsrf_token, base_url)
+    before = await asyncio.to_thread(server_metrics, metrics_url)
+    baseline_rss = sampler.rss_bytes() if sampler.available else 0
+    sampler.cpu, sampler.rss = [], []
+    connected = [0]
+    peak_rss_per_session: List[float] = []
+
+    stop = asyncio.Event()
+    sampling = asyncio.create_task(sampler.run(stop))
+    started = time.monotonic()
+    deadline = started + args.ramp + args.duration
+    users = [
+        asyncio.create_task(simulated_user(base_url, xsrf, stats, user_numbers, deadline,
+                                           args.ramp * user / sessions, args, connected))
+        for user in range(sessions)
+    ]
+    while not all(user.done() for user in users):
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        if sampler.available and connected[0] and time.monotonic() > started + args.ramp:
+            peak_rss_per_session.append((sampler.rss_bytes() - baseline_rss) / connected[0])
+    elapsed = time.monotonic() - started
+    stop.set()
+    await sampling
+    after = await asyncio.to_thread(server_metrics, metrics_url)
+
+    reruns = stats.reruns()
+    result = {
+        "sessions": sessions,
+        "users_finished": stats.users_finished,
+        "reruns": len(reruns),
+        "reruns_per_s": round(len(reruns) / elapsed, 1),
+        "p50_ms": round(statistics.median(reruns), 1) if reruns else None,
+        "p95_ms": round(percentile(reruns, 95), 1) if reruns else None,
+        "p99_ms": round(percentile(reruns, 99), 1) if reruns else None,
+        "max_ms": round(max(reruns), 1) if reruns else None,
+        "errors": sum(stats.errors.values()) + stats.app_errors,
+        "scenario_failures": stats.scenario_failures + stats.app_errors,
+        "error_reasons": {**stats.errors, **({"app exception": stats.app_errors} if stats.app_errors else {})},
+        "per_action_p95_ms": {action: round(percentile(samples, 95), 1)
+                              for action, samples in sorted(stats.latencies.items())},
+    }
+    if sampler.available and sampler.cpu:
+        result.update({
+            "cpu_mean_pct": round(statistics.mean(sampler.cpu), 1),
+            "cpu_max_pct": round(max(sampler.cpu), 1),
+            "rss_mb": round(max(sampler.rss) / 1024 ** 2, 1),
+            "rss_per_session_kb": round(statistics.median(peak_rss_per_session) / 1024, 1)
+            if peak_rss_per_session else None,
+        })
+    script_ms = mean_between(before, after, "script_run")
+    session_bytes = mean_between(before, after, "session_state_bytes")
+    if script_ms is not None:
+        result["server_script_ms"] = round(script_ms, 1)
+    if session_bytes is not None:
+        result["session_state_kb"] = round(session_bytes / 1024, 1)
+    return result
+
+
+# Server
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, metrics_port: int, scratch: str) -> subprocess.Popen:
+    """Start ``streamlit run app.py`` with its storage, uploads and metrics kept in ``scratch``."""
+    env = {
+        **os.environ,
+        "AGENT_FORM_STORAGE": os.environ.get("AGENT_FORM_STORAGE",
+                                             f"sqlite:///{os.path.join(scratch, 'load_test.db')}"),
+        "AGENT_FORM_SPOOL": os.environ.get("AGENT_FORM_SPOOL", os.path.join(scratch, "uploads")),
+        "AGENT_FORM_METRICS": "1",
+        "AGENT_FORM_METRICS_FILE": os.path.join(scratch, "metrics.json"),
+        "AGENT_FORM_METRICS_PORT": str(metrics_port),
+    }
+    command = [
+        sys.executable, "-m", "streamlit", "run", APP_PATH,
+        "--server.headless", "true",
+        "--server.port", str(port),
+        "--server.fileWatcherType", "none",
+        "--browser.gatherUsageStats", "false",
+    ]
+    with open(os.path.join(scratch, "server.log"), "w") as log:
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    health = f"http://127.0.0.1:{port}/_stcore/health"
+    give_up = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < give_up:
+        if server.poll() is not None:
+            raise RuntimeError(f"streamlit exited with {server.returncode}; see {scratch}/server.log")
+        try:
+            with urllib.request.urlopen(health, timeout=1) as response:
+                response.read()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"streamlit did not come up within {STARTUP_TIMEOUT:.0f}s; see {scratch}/server.log")
+
+
+def print_row(result: Dict):
+    def cell(key: str, width: int) -> str:
+        value = result.get(key)
+        return f"{'-' if value is None else value:>{width}}"
+
+    print(f"{result['sessions']:>8} {cell('reruns_per_s', 9)} {cell('p50_ms', 8)} {cell('p95_ms', 8)} "
+          f"{cell('p99_ms', 8)} {cell('max_ms', 8)} {cell('errors', 6)} {cell('cpu_mean_pct', 6)} "
+          f"{cell('rss_mb', 7)} {cell('rss_per_session_kb', 9)} {cell('server_script_ms', 9)} "
+          f"{cell('session_state_kb', 9)}")
+
+
+def saturation(results: List[Dict], slo_ms: float) -> Optional[Dict]:
+    """Return the first level over the latency objective or at a full core."""
+    for result in results:
+        if (result["p95_ms"] or 0) > slo_ms or result.get("cpu_mean_pct", 0) >= SATURATED_CPU:
+            return result
+    return None
+
+
+async def warm_up(base_url: str):
+    """Run the script once so the first level does not pay for the app's lazy imports."""
+    session = Session(base_url, await asyncio.to_thread(xsrf_token, base_url), LevelStats())
+    try:
+        await session.connect()
+        await fill_in_form(session, 0, sections=1, cases=1, think=0)
+    finally:
+        await session.close()
+
+
+async def run(args: argparse.Namespace, base_url: str, pid: Optional[int], metrics_url: Optional[str]) -> List[Dict]:
+    await warm_up(base_url)
+    sampler = ProcessSampler(pid)
+    user_numbers = iter(range(1, 10 ** 9))
+    results = []
+    print(f"{'sessions':>8} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'errors':>6} {'cpu %':>6} {'rss MB':>7} {'KB/sess':>9} {'script ms':>9} {'state KB':>9}")
+    for sessions in [int(level) for level in args.sessions.split(",")]:
+        result = await run_level(sessions, base_url, sampler, metrics_url, user_numbers, args)
+        results.append(result)
+        print_row(result)
+        if result["error_reasons"]:
+            print(f"{'':>8} errors: " + ", ".join(f"{reason} x{count}"
+                                                 for reason, count in result["error_reasons"].items()))
+        if args.cooldown:
+            await asyncio.sleep(args.cooldown)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", default=DEFAULT_SESSIONS, help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of steady load per level")
+    parser.add_argument("--ramp", type=float, default=10, help="Seconds over which a level's users arrive")
+    parser.add_argument("--cooldown", type=float, default=5, help="Seconds of idle between levels")
+    parser.add_argument("--think", type=float, default=2.0, help="Mean seconds a user pauses between actions")
+    parser.add_argument("--sections-per-user", type=int, default=2)
+    parser.add_argument("--cases-per-section", type=int, default=2)
+    parser.add_argument("--slo-ms", type=float, default=1000, help="p95 rerun latency objective")
+    parser.add_argument("--url", help="Attach to a running server instead of starting one")
+    parser.add_argument("--pid", type=int, help="Process id of the server given by --url, for CPU and memory")
+    parser.add_argument("--metrics-url", help="The app's metrics JSON endpoint when attaching, "
+                                              "e.g. http://127.0.0.1:9464/metrics.json")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base_url, pid, metrics_url = args.url.rstrip("/") + "/", args.pid, args.metrics_url
+    else:
+        scratch = tempfile.mkdtemp(prefix="agent_form_load_")
+        port, metrics_port = free_port(), free_port()
+        try:
+            server = start_server(port, metrics_port, scratch)
+        except RuntimeError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+        base_url, pid = f"http://127.0.0.1:{port}/", server.pid
+        metrics_url = f"http://127.0.0.1:{metrics_port}/metrics.json"
+        print(f"Started streamlit (pid {pid}) on {base_url}; logs in {scratch}")
+
+    try:
+        results = asyncio.run(run(args, base_url, pid, metrics_url))
+    except KeyboardInterrupt:
+        return 130
+    except ScenarioFailed as exc:
+        print(f"Warm-up failed, the scenario does not run against this app: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    saturated = saturation(results, args.slo_ms)
+    if saturated is None:
+        print(f"\nNo saturation up to {results[-1]['sessions']} sessions "
+              f"(p95 under {args.slo_ms:.0f} ms, CPU under {SATURATED_CPU:.0f}%).")
+    else:
+        print(f"\nSaturated at {saturated['sessions']} sessions: p95 {saturated['p95_ms']} ms, "
+              f"CPU {saturated.get('cpu_mean_pct', '-')}%.")
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump({"args": vars(args), "levels": results}, handle, indent=2)
+        print(f"Results written to {args.save}")
+    failures = sum(result["scenario_failures"] for result in results)
+    if failures:
+        # Timings of a scenario the app did not follow (errors, unsaved use cases) measure the wrong thing
+        print(f"{failures} simulated users saw errors or missing saves; these results are not valid.",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""Rerun latency benchmark for app.py, driven headlessly by Streamlit's AppTest.
+
+For each form size the app is seeded with that many use cases, spread over
+at most ``SEED_MAX_SECTIONS`` sections, then typical interactions are
+timed: typing in a section field, "Add & Continue", deleting a case,
+deleting a section and rerendering the export tabs. Every sample starts from a freshly seeded session so runs do not
+influence each other. A sample fails if the app shows an error or warning,
+or "Add & Continue" does not save, so no size times an error path.
+
+Reported per interaction and size: p50/p95/max rerun time, peak Python
+memory allocated during the rerun (tracemalloc) and the serialized size of
+the rendered element tree, which approximates the websocket payload.
+
+AppTest always reruns the whole script, so fragment-scoped reruns are
+measured as full reruns here; treat the numbers as an upper bound.
+
+Usage:
+    python benchmarks/rerun_benchmark.py                    # run and compare
+    python benchmarks/rerun_benchmark.py --save-baseline    # record a baseline
+    python benchmarks/rerun_benchmark.py --sizes 1,10 --repeat 3
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SEED_MAX_SECTIONS = 100  # Below app.SESSION_MAX_SECTIONS, so adding to a seeded form is allowed
+
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from schema import FREQUENCIES, LEVELS  # noqa: E402
+from store import UseCaseStore  # noqa: E402
+
+
+def seed_store(size: int) -> UseCaseStore:
+    """Return a store with ``size`` use cases spread across up to ``SEED_MAX_SECTIONS`` sections."""
+    store = UseCaseStore()
+    sections = min(size, SEED_MAX_SECTIONS)
+    for section in range(sections):
+        store.add_section(f"Section {section}")
+    for case in range(size):
+        store.add(
+            f"Section {case % sections}",
+            use_case=f"Use case {case}",
+            description=f"Automate step {case} of the intake process",
+            current_process="Handled manually by email",
+            value=case % 10 + 1,
+            impact=(case * 7) % 10 + 1,
+            feasibility=LEVELS[case % 3],
+            frequency=FREQUENCIES[case % 5],
+            complexity=LEVELS[(case + 1) % 3],
+            risks="Data quality",
+            compliance="GDPR",
+            priority=LEVELS[(case + 2) % 3],
+        )
+    return store
+
+
+def new_app(size: int, timeout: float) -> AppTest:
+    """Return an AppTest that has completed its first run with a seeded form."""
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["target_sections"] = seed_store(size)
+    at.session_state["business_name"] = "Benchmark Inc"
+    return at.run()
+
+
+# Interactions: each takes a warmed-up AppTest and queues a widget change;
+# the rerun that follows is what gets timed.
+def type_in_section(at: AppTest):
+    at.text_area(key="description_Section 0").input("Typed while benchmarking")
+
+
+def add_and_continue(at: AppTest):
+    at.text_input(key="use_case_Section 0").input("Benchmark case")
+    at.text_area(key="description_Section 0").input("Added while benchmarking")
+    at.button(key="add_another_Section 0").click()
+
+
+def delete_case(at: AppTest):
+    next(button for button in at.button if (button.key or "").startswith("del_case_")).click()
+
+
+def delete_section(at: AppTest):
+    at.button(key="del_sec_Section 0").click()
+
+
+def render_export_tabs(at: AppTest):
+    """No widget change: a plain rerun with the export tabs on screen."""
+
+
+INTERACTIONS: Dict[str, Callable[[AppTest], None]] = {
+    "type_in_section": type_in_section,
+    "add_and_continue": add_and_continue,
+    "delete_case": delete_case,
+    "delete_section": delete_section,
+    "render_export_tabs": render_export_tabs,
+}
+
+# What an interaction must have done, given the seeded size, for its timing to count
+OUTCOMES: Dict[str, Callable[[AppTest, int], bool]] = {
+    "add_and_continue": lambda at, size: at.session_state["target_sections"].case_count == size + 1,
+}
+
+
+def payload_bytes(at: AppTest) -> int:
+    """Return the serialized size of every rendered element and block."""
+    return sum(
+        node.proto.ByteSize()
+        for node in at._tree
+        if getattr(node, "proto", None) is not None
+    )
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_sample(name: str, size: int, timeout: float, trace_memory: bool = False) -> Tuple[AppTest, float, float]:
+    """Seed a fresh session, apply one interaction and time the rerun.
+
+    Returns the AppTest, the rerun time in ms and, when ``trace_memory`` is
+    set, the peak memory allocated during the rerun in KB.
+    """
+    at = new_app(size, timeout)
+    INTERACTIONS[name](at)
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    at.run()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    peak_kb = 0.0
+    if trace_memory:
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+    if at.exception:
+        raise RuntimeError(f"{name} at size {size} raised: {at.exception[0].message}")
+    shown = [*at.error, *at.warning]
+    if shown:
+        raise RuntimeError(f"{name} at size {size} showed: {shown[0].value}")
+    if name in OUTCOMES and not OUTCOMES[name](at, size):
+        raise RuntimeError(f"{name} at size {size} did not take effect")
+    return at, elapsed_ms, peak_kb
+
+
+def measure(name: str, size: int, repeat: int, timeout: float) -> Dict:
+    """Time one interaction at one form size."""
+    samples = [run_sample(name, size, timeout) for _ in range(repeat)]
+    timings = [elapsed_ms for _, elapsed_ms, _ in samples]
+    # tracemalloc slows allocation-heavy code a lot, so memory gets its own sample
+    _, _, peak_kb = run_sample(name, size, timeout, trace_memory=True)
+    return {
+        "p50_ms": round(statistics.median(timings), 2),
+        "p95_ms": round(percentile(timings, 95), 2),
+        "max_ms": round(max(timings), 2),
+        "peak_kb": round(peak_kb, 1),
+        "payload_kb": round(payload_bytes(samples[-1][0]) / 1024, 1),
+    }
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return a line per metric that regressed by more than ``tolerance``."""
+    regressions = []
+    for name, sizes in results.items():
+        for size, metrics in sizes.items():
+            previous = baseline.get(name, {}).get(size)
+            if not previous:
+                continue
+            for metric in ("p50_ms", "p95_ms", "peak_kb", "payload_kb"):
+                before, after = previous.get(metric), metrics[metric]
+                if before and after > before * (1 + tolerance):
+                    regressions.append(
+                        f"{name} @ {size}: {metric} {before} -> {after} "
+                        f"(+{(after / before - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1,10,100,1000",
+                        help="Comma-separated numbers of use cases to seed")
+    parser.add_argument("--interactions", default=",".join(INTERACTIONS),
+                        help="Comma-separated interactions to time")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per interaction and size")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-rerun timeout in seconds")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown before a metric counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Keep drafts and uploads from the benchmark out of the real data files
+    scratch = tempfile.mkdtemp(prefix="agent_form_bench_")
+    os.environ.setdefault("AGENT_FORM_STORAGE", f"sqlite:///{os.path.join(scratch, 'bench.db')}")
+    os.environ.setdefault("AGENT_FORM_SPOOL", os.path.join(scratch, "uploads"))
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results: Dict[str, Dict[str, Dict]] = {}
+    print(f"{'interaction':<20} {'size':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'peak KB':>9} {'payload KB':>11}")
+    for name in args.interactions.split(","):
+        results[name] = {}
+        for size in sizes:
+            metrics = measure(name, size, args.repeat, args.timeout)
+            results[name][str(size)] = metrics
+            print(f"{name:<20} {size:>6} {metrics['p50_ms']:>9} {metrics['p95_ms']:>9} "
+                  f"{metrics['max_ms']:>9} {metrics['peak_kb']:>9} {metrics['payload_kb']:>11}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as handle:
+            json.dump(results, handle, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to record one.")
+        return 0
+    with open(args.baseline) as handle:
+        regressions = compare(results, json.load(handle), args.tolerance)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""Bulk import of use cases from the app's own CSV, NDJSON or JSON export formats.
+
+Every row is validated in one pass of vectorized pandas checks, and the
+rows that pass are handed back grouped by section so they can be inserted
+in a single batch.
+"""
+import json
+from typing import BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from schema import SCHEMA, SCORE_MAX, SCORE_MIN
+from store import (BUSINESS_NAME_REQUIRED, CASE_CHOICES, CASE_DEFAULTS, CASE_FIELDS, CSV_HEADERS, SCORE_FIELDS,
+                   SECTION_REQUIRED, USE_CASE_REQUIRED)
+
+
+class ImportFileError(Exception):
+    """Raised when an import file cannot be read at all."""
+
+
+class ImportResult(NamedTuple):
+    """Valid rows grouped by section, plus one error message per rejected row."""
+
+    sections: Dict[str, List[Dict]]
+    errors: pd.DataFrame
+    total_rows: int
+
+    @property
+    def imported(self) -> int:
+        return self.total_rows - len(self.errors)
+
+
+def _csv_int(text: str):
+    """Parse a CSV score cell; anything but a whole number is left for validation to reject."""
+    try:
+        return int(text)
+    except ValueError:
+        return text
+
+
+def read_csv(fileobj: BinaryIO) -> pd.DataFrame:
+    """Read a CSV in the export layout into a frame keyed by field name."""
+    frame = pd.read_csv(fileobj, dtype=str, keep_default_na=False)
+    columns = {header: field for field, header in CSV_HEADERS.items()}
+    columns["Section"] = "section"
+    frame = frame.rename(columns=columns).astype(object)
+    # CSV has no types, so scores arrive as text
+    for field in SCORE_FIELDS:
+        if field in frame:
+            frame[field] = frame[field].map(_csv_int).astype(object)
+    return frame
+
+
+def read_ndjson(fileobj: BinaryIO) -> pd.DataFrame:
+    """Read an NDJSON export (one object per use case, keyed by column header)."""
+    records = [json.loads(line) for line in fileobj if line.strip()]
+    if not all(isinstance(record, dict) for record in records):
+        raise ImportFileError("Each NDJSON line must be a use case object.")
+    columns = {header: field for field, header in CSV_HEADERS.items()}
+    columns["Section"] = "section"
+    # dtype=object keeps every value as parsed, so validation sees the JSON types
+    return pd.DataFrame(records, dtype=object).rename(columns=columns)
+
+
+def read_json(fileobj: BinaryIO) -> pd.DataFrame:
+    """Flatten a JSON export document into one row per use case."""
+    return pd.DataFrame(_document_records(json.load(fileobj)), dtype=object)
+
+
+def _document_records(document) -> List[Dict]:
+    target_sections = document.get("target_sections") if isinstance(document, dict) else None
+    if not isinstance(target_sections, dict):
+        raise ImportFileError("JSON document has no 'target_sections' object.")
+    if not all(isinstance(cases, list) and all(isinstance(case, dict) for case in cases)
+               for cases in target_sections.values()):
+        raise ImportFileError("Each section in 'target_sections' must be a list of use case objects.")
+    return [
+        {**case, "section": section}
+        for section, cases in target_sections.items()
+        for case in cases
+    ]
+
+
+READERS = {
+    "csv": read_csv,
+    "ndjson": read_ndjson,
+    "json": read_json,
+}
+
+
+def read_upload(fileobj: BinaryIO, name: str) -> pd.DataFrame:
+    """Read an uploaded import file, choosing the reader by extension."""
+    extension = name.rsplit(".", 1)[-1].lower()
+    if extension not in READERS:
+        raise ImportFileError(f"Unsupported import format: .{extension}")
+    try:
+        return READERS[extension](fileobj)
+    except (ValueError, pd.errors.ParserError) as exc:
+        raise ImportFileError(f"Could not read {name}: {exc}") from exc
+
+
+def _is_text(value) -> bool:
+    # Missing cells (None, or NaN in a frame) count as blank text
+    return isinstance(value, str) or value is None or (isinstance(value, float) and value != value)
+
+
+def _is_whole_number(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check(frame: pd.DataFrame):
+    """Normalize the frame and run every rule on all rows at once.
+
+    Values are type-checked as given before anything is coerced, so a
+    ``true`` or ``"5"`` score or a list in a text field is rejected the way
+    the form's validator rejects it. Returns the normalized frame, a mask of
+    invalid rows and one joined error message per invalid row (1-based
+    ``Row``).
+    """
+    frame = frame.reset_index(drop=True).astype(object)
+    # Fields a row leaves out take the form defaults, whether the whole
+    # column is missing or only some rows (JSON/NDJSON objects) omit them
+    for field in ("section",) + CASE_FIELDS:
+        default = CASE_DEFAULTS.get(field, "")
+        if field not in frame:
+            frame[field] = default
+        else:
+            frame[field] = frame[field].where(frame[field].notna(), default)
+    frame = frame[["section", *CASE_FIELDS]]
+
+    text_fields = [field for field in ("section",) + CASE_FIELDS
+                   if field not in SCORE_FIELDS]
+    # Choice fields need no type check: anything but one of the choices fails anyway
+    not_text = {field: ~frame[field].map(_is_text).astype(bool)
+                for field in text_fields if field not in CASE_CHOICES}
+    frame[text_fields] = frame[text_fields].fillna("").astype(str).apply(lambda column: column.str.strip())
+
+    # The schema's rules (schema.CompiledSchema.validate), vectorized
+    checks = {"Section is required": frame["section"].eq("")}
+    for field, message in SCHEMA.required:
+        checks[message] = frame[field].eq("")
+    for field, broken in not_text.items():
+        checks[f"{CSV_HEADERS.get(field, 'Section')} must be text"] = broken
+    for field in SCORE_FIELDS:
+        scores = pd.to_numeric(frame[field].where(frame[field].map(_is_whole_number).astype(bool)),
+                               errors="coerce")
+        checks[SCHEMA.messages[field]] = scores.isna() | ~scores.between(SCORE_MIN, SCORE_MAX)
+        frame[field] = scores
+    for field, choices in CASE_CHOICES.items():
+        checks[SCHEMA.messages[field]] = ~frame[field].isin(choices)
+
+    failed = pd.DataFrame(checks)
+    invalid = failed.any(axis=1)
+    hits = failed[invalid].stack()
+    hits = hits[hits].reset_index()
+    hits.columns = ["Row", "Errors", "failed"]
+    errors = hits.groupby("Row", sort=True)["Errors"].agg("; ".join).reset_index()
+    errors["Row"] += 1
+    return frame, invalid, errors
+
+
+def validate(frame: pd.DataFrame) -> ImportResult:
+    """Validate every row at once and split the frame into rows and errors."""
+    frame, invalid, errors = _check(frame)
+    valid = frame[~invalid].astype({field: int for field in SCORE_FIELDS})
+    sections = {
+        section: rows.drop(columns="section").to_dict("records")
+        for section, rows in valid.groupby("section", sort=False)
+    }
+    return ImportResult(sections, errors, len(frame))
+
+
+def validate_documents(documents: List) -> List[Tuple[Optional[Dict], List[str]]]:
+    """Validate export documents as whole submissions, all rows in one pass.
+
+    Returns ``(payload, errors)`` per document: the normalized submission
+    payload and no errors, or None and every error found. Unlike a file
+    import, any invalid row rejects its submission, as the form would not
+    let it be submitted either.
+    """
+    errors: List[List[str]] = [[] for _ in documents]
+    records, owners, rows = [], [], []
+    for index, document in enumerate(documents):
+        try:
+            document_records = _document_records(document)
+        except ImportFileError as exc:
+            errors[index].append(str(exc))
+            continue
+        business_name = document.get("business_name")
+        if not isinstance(business_name, str) or not business_name.strip():
+            errors[index].append(BUSINESS_NAME_REQUIRED)
+        if not document["target_sections"]:
+            errors[index].append(SECTION_REQUIRED)
+        elif not document_records:
+            errors[index].append(USE_CASE_REQUIRED)
+        # Fields missing from a case take the form defaults, whatever other documents hold
+        records += [{**CASE_DEFAULTS, **record} for record in document_records]
+        owners += [index] * len(document_records)
+        rows += range(1, len(document_records) + 1)
+
+    sections: List[Dict[str, List[Dict]]] = [
+        # Keep empty sections, as a form submission does
+        {str(section).strip(): [] for section in document["target_sections"]} if not errors[index] else {}
+        for index, document in enumerate(documents)
+    ]
+    if records:
+        frame, invalid, row_errors = _check(pd.DataFrame(records, dtype=object))
+        for row, message in zip(row_errors["Row"], row_errors["Errors"]):
+            errors[owners[row - 1]].append(f"Row {rows[row - 1]}: {message}")
+        valid = frame[~invalid].astype({field: int for field in SCORE_FIELDS})
+        for owner, case in zip(valid.index, valid.to_dict("records")):
+            owner = owners[owner]
+            if not errors[owner]:
+                sections[owner].setdefault(case.pop("section"), []).append(case)
+
+    return [
+        (None, document_errors) if document_errors else
+        ({"business_name": document["business_name"].strip(), "target_sections": sections[index],
+          "documents": []}, [])
+        for index, (document, document_errors) in enumerate(zip(documents, errors))
+    ]
@@ -0,0 +1,286 @@
+"""Near-duplicate detection for use cases with MinHash signatures and LSH.
+
+The title and description are reduced to character shingles and each case
+gets a fixed-size MinHash signature. Signatures are cut into bands that are
+hashed into buckets, and only cases sharing a bucket are compared, so a
+lookup costs the same however many cases are indexed. All hashes are
+seeded deterministically, so signatures stored in the database stay
+comparable across processes and restarts.
+
+Run as a script to produce a duplicate report for an exported CSV or JSON
+file:
+
+    python dedup.py agent_form_export.csv --threshold 0.6 > duplicates.csv
+"""
+import argparse
+import csv
+import random
+import re
+import sqlite3
+import sys
+import zlib
+from typing import TYPE_CHECKING, Dict, Iterable, List, Set, Tuple
+
+from analytics import fold_new_submissions
+from store import UseCase
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SHINGLE_SIZE = 4  # Characters per shingle
+NUM_PERM = 64  # MinHash signature length
+BANDS = 16  # 16 bands of 4 rows: pairs from about 0.5 similarity collide in some band
+ROWS = NUM_PERM // BANDS
+DUPLICATE_THRESHOLD = 0.6  # Estimated Jaccard similarity reported as a likely duplicate
+MAX_CANDIDATES = 500  # Bucket mates compared per stored-submission lookup
+LSH_VERSION = 2  # Bump when band_buckets changes; stored buckets are then recomputed
+REBUCKET_CHUNK = 1000  # Stored signatures re-bucketed per query
+
+_PRIME = (1 << 31) - 1  # Small enough that a * x + b fits in 64 bits
+_rng = random.Random(20240611)
+_A = [_rng.randrange(1, _PRIME) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, _PRIME) for _ in range(NUM_PERM)]
+
+DEDUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS submission_signatures (
+    case_ref INTEGER PRIMARY KEY,
+    submission_id INTEGER NOT NULL,
+    section TEXT NOT NULL,
+    use_case TEXT NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS submission_lsh (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    case_ref INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON submission_lsh (band, bucket);
+"""
+
+
+def case_text(use_case: str, description: str) -> str:
+    """Normalize the compared text: lowercase words joined by single spaces."""
+    return " ".join(re.findall(r"\w+", f"{use_case} {description}".lower()))
+
+
+def shingles(text: str) -> Set[int]:
+    """Return the hashed character shingles of normalized text."""
+    if len(text) <= SHINGLE_SIZE:
+        return {zlib.crc32(text.encode()) % _PRIME}
+    return {
+        zlib.crc32(text[start:start + SHINGLE_SIZE].encode()) % _PRIME
+        for start in range(len(text) - SHINGLE_SIZE + 1)
+    }
+
+
+def signature(use_case: str, description: str) -> "np.ndarray":
+    """Return the MinHash signature of a use case's title and description."""
+    import numpy as np
+
+    values = np.fromiter(shingles(case_text(use_case, description)), dtype=np.uint64)
+    a = np.array(_A, dtype=np.uint64)[:, None]
+    b = np.array(_B, dtype=np.uint64)[:, None]
+    return ((a * values[None, :] + b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(first: "np.ndarray", second: "np.ndarray") -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return float((first == second).mean())
+
+
+def band_buckets(sig: "np.ndarray") -> List[int]:
+    """Hash each band of a signature to a bucket id.
+
+    CRC-32 over the band's little-endian bytes, so bucket ids stored in the
+    database mean the same in every process, Python version and platform.
+    """
+    data = sig.astype("<u4").tobytes()
+    width = ROWS * 4
+    return [zlib.crc32(data[band * width:(band + 1) * width]) for band in range(BANDS)]
+
+
+class LSHIndex:
+    """Banded MinHash buckets over arbitrary keys."""
+
+    def __init__(self):
+        self._buckets: List[Dict[int, Set]] = [{} for _ in range(BANDS)]
+        self._signatures: Dict = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def add(self, key, sig: "np.ndarray"):
+        self._signatures[key] = sig
+        for band, bucket in enumerate(band_buckets(sig)):
+            self._buckets[band].setdefault(bucket, set()).add(key)
+
+    def remove(self, key):
+        sig = self._signatures.pop(key, None)
+        if sig is None:
+            return
+        for band, bucket in enumerate(band_buckets(sig)):
+            members = self._buckets[band][bucket]
+            members.discard(key)
+            if not members:
+                del self._buckets[band][bucket]
+
+    def query(self, sig: "np.ndarray", threshold: float = DUPLICATE_THRESHOLD,
+              exclude=None) -> List[Tuple[object, float]]:
+        """Return ``(key, similarity)`` for indexed keys at or above ``threshold``, best first."""
+        candidates = set()
+        for band, bucket in enumerate(band_buckets(sig)):
+            candidates.update(self._buckets[band].get(bucket, ()))
+        candidates.discard(exclude)
+        matches = [(key, similarity(sig, self._signatures[key])) for key in candidates]
+        return sorted((match for match in matches if match[1] >= threshold), key=lambda match: -match[1])
+
+
+class DuplicateIndex(LSHIndex):
+    """LSH index over the use cases of one store, kept current as a listener."""
+
+    def rebuild(self, cases: Iterable[UseCase]):
+        for buckets in self._buckets:
+            buckets.clear()
+        self._signatures.clear()
+        for case in cases:
+            self.case_added(case)
+
+    def case_added(self, case: UseCase):
+        self.add(case.id, signature(case.use_case, case.description))
+
+    def case_removed(self, case: UseCase):
+        self.remove(case.id)
+
+    def check(self, use_case: str, description: str,
+              threshold: float = DUPLICATE_THRESHOLD) -> List[Tuple[int, float]]:
+        """Return ``(case_id, similarity)`` of likely duplicates of a new case."""
+        return self.query(signature(use_case, description), threshold)
+
+
+def find_duplicates(records: Iterable[Tuple[object, str, str]],
+                    threshold: float = DUPLICATE_THRESHOLD) -> List[Tuple[object, object, float]]:
+    """Return ``(earlier_key, later_key, similarity)`` for near-duplicate pairs.
+
+    ``records`` yields ``(key, use_case, description)``. Each record is
+    checked against the ones before it, then indexed.
+    """
+    index = LSHIndex()
+    pairs = []
+    for key, use_case, description in records:
+        sig = signature(use_case, description)
+        pairs.extend((match, key, score) for match, score in index.query(sig, threshold))
+        index.add(key, sig)
+    return pairs
+
+
+# Stored submissions
+def _index_submissions(conn: sqlite3.Connection, submissions: List[Tuple[int, Dict, float]]):
+    for submission_id, payload, _ in submissions:
+        for section, cases in (payload.get("target_sections") or {}).items():
+            for case in cases:
+                sig = signature(case.get("use_case", ""), case.get("description", ""))
+                case_ref = conn.execute(
+                    "INSERT INTO submission_signatures (submission_id, section, use_case, signature) "
+                    "VALUES (?, ?, ?, ?)",
+                    (submission_id, section, case.get("use_case", ""), sig.tobytes()),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO submission_lsh (band, bucket, case_ref) VALUES (?, ?, ?)",
+                    [(band, bucket, case_ref) for band, bucket in enumerate(band_buckets(sig))],
+                )
+
+
+def _rebucket(conn: sqlite3.Connection):
+    """Recompute every stored bucket if they were written by another ``LSH_VERSION``."""
+    row = conn.execute("SELECT value FROM rollup_state WHERE name = 'dedup_lsh_version'").fetchone()
+    if row and row[0] == LSH_VERSION:
+        return
+    import numpy as np
+
+    conn.execute("DELETE FROM submission_lsh")
+    last_ref = 0
+    while True:
+        chunk = conn.execute(
+            "SELECT case_ref, signature FROM submission_signatures WHERE case_ref > ? ORDER BY case_ref LIMIT ?",
+            (last_ref, REBUCKET_CHUNK),
+        ).fetchall()
+        if not chunk:
+            break
+        conn.executemany(
+            "INSERT INTO submission_lsh (band, bucket, case_ref) VALUES (?, ?, ?)",
+            [(band, bucket, case_ref) for case_ref, blob in chunk
+             for band, bucket in enumerate(band_buckets(np.frombuffer(blob, dtype=np.uint32)))],
+        )
+        last_ref = chunk[-1][0]
+    conn.execute(
+        "INSERT INTO rollup_state (name, value) VALUES ('dedup_lsh_version', ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+        (LSH_VERSION,),
+    )
+
+
+def refresh_dedup_index(conn: sqlite3.Connection) -> int:
+    """Sign and bucket every submission not yet indexed (inside a write transaction)."""
+    _rebucket(conn)
+    return fold_new_submissions(conn, "dedup_watermark", _index_submissions)
+
+
+def similar_submissions(conn: sqlite3.Connection, use_case: str, description: str,
+                        threshold: float = DUPLICATE_THRESHOLD, limit: int = 5) -> List[Dict]:
+    """Return stored use cases that are likely duplicates of the given text."""
+    import numpy as np
+
+    sig = signature(use_case, description)
+    buckets = band_buckets(sig)
+    rows = conn.execute(
+        "SELECT DISTINCT s.case_ref, s.submission_id, s.section, s.use_case, s.signature "
+        "FROM submission_lsh AS l JOIN submission_signatures AS s ON s.case_ref = l.case_ref "
+        f"WHERE {' OR '.join(['(l.band = ? AND l.bucket = ?)'] * BANDS)} LIMIT ?",
+        [value for band, bucket in enumerate(buckets) for value in (band, bucket)] + [MAX_CANDIDATES],
+    ).fetchall()
+    matches = []
+    for case_ref, submission_id, section, title, blob in rows:
+        score = similarity(sig, np.frombuffer(blob, dtype=np.uint32))
+        if score >= threshold:
+            matches.append({"submission_id": submission_id, "section": section,
+                            "use_case": title, "similarity": round(score, 2)})
+    matches.sort(key=lambda match: -match["similarity"])
+    return matches[:limit]
+
+
+def main() -> int:
+    from bulk_import import ImportFileError, read_upload
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate use cases in an exported CSV or JSON file.")
+    parser.add_argument("path", help="File exported from the form (CSV or JSON)")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                        help="Minimum estimated similarity to report (0-1)")
+    args = parser.parse_args()
+
+    try:
+        with open(args.path, "rb") as handle:
+            frame = read_upload(handle, args.path)
+    except (OSError, ImportFileError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    for column in ("section", "use_case", "description"):
+        if column not in frame:
+            frame[column] = ""
+    frame = frame.reset_index(drop=True).fillna("")
+    records = (
+        (row, str(frame.at[row, "use_case"]), str(frame.at[row, "description"]))
+        for row in frame.index
+    )
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["Row", "Section", "Use Case", "Duplicate Row", "Duplicate Section",
+                     "Duplicate Use Case", "Similarity"])
+    for first, second, score in find_duplicates(records, args.threshold):
+        writer.writerow([
+            first + 1, frame.at[first, "section"], frame.at[first, "use_case"],
+            second + 1, frame.at[second, "section"], frame.at[second, "use_case"], round(score, 2),
+        ])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
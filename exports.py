@@ -0,0 +1,286 @@
+"""Row-based export formats, written incrementally to a binary stream.
+
+Every format shares one row schema (``EXPORT_COLUMNS``, the CSV export
+layout), and every writer consumes an iterator of rows, so an export of
+all stored submissions never holds more than one batch in memory. Text
+formats can be gzip- or zstd-compressed on the fly; Parquet and Arrow use
+their own built-in codecs instead.
+
+Parquet and Arrow need pyarrow and zstd needs the zstandard package; both
+are optional, and ``available_formats``/``available_compressions`` only
+list what is installed.
+
+Run as a script to export every stored submission:
+
+    python exports.py submissions.parquet --format parquet --compression zstd
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from store import CASE_DEFAULTS, CASE_FIELDS, CSV_HEADERS, SCORE_FIELDS, UseCaseStore
+
+# One row per use case, in column order
+EXPORT_COLUMNS = ["Business", "Section", *(CSV_HEADERS[field] for field in CASE_FIELDS)]
+INTEGER_COLUMNS = {CSV_HEADERS[field] for field in SCORE_FIELDS}
+
+BATCH_ROWS = 10000  # Rows per Parquet row group / Arrow record batch
+XLSX_MAX_ROWS = 1048575  # Excel's sheet limit, less the header row
+STREAM_COMPRESSED = ("csv", "ndjson")  # Formats compressed by wrapping the output stream
+COMPRESSED_MIME = {"gzip": "application/gzip", "zstd": "application/zstd"}
+
+Row = Tuple
+
+
+# Row sources
+def store_rows(target_sections: UseCaseStore, business_name: str) -> Iterator[Row]:
+    """Yield the export rows of an in-memory store."""
+    for section in target_sections:
+        for case in target_sections.cases(section):
+            yield (business_name, section, *(getattr(case, field) for field in CASE_FIELDS))
+
+
+def submission_rows(submissions: Iterable[Tuple[int, Dict]]) -> Iterator[Row]:
+    """Yield the export rows of ``(submission_id, payload)`` pairs, e.g. ``storage.iter_submissions()``."""
+    for _, payload in submissions:
+        business_name = payload.get("business_name", "")
+        for section, cases in (payload.get("target_sections") or {}).items():
+            for case in cases:
+                yield (business_name, section, *(case.get(field, CASE_DEFAULTS[field]) for field in CASE_FIELDS))
+
+
+def _batches(rows: Iterable[Row], size: int) -> Iterator[List[Row]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# Compression
+def _zstd_writer(out: BinaryIO) -> BinaryIO:
+    import zstandard
+
+    return zstandard.ZstdCompressor().stream_writer(out, closefd=False)
+
+
+COMPRESSORS: Dict[str, Tuple[str, Callable[[BinaryIO], BinaryIO]]] = {
+    "gzip": (".gz", lambda out: gzip.GzipFile(fileobj=out, mode="wb")),
+    "zstd": (".zst", _zstd_writer),
+}
+
+
+def available_compressions() -> List[str]:
+    """Return the stream compressions usable in this environment."""
+    from importlib.util import find_spec
+
+    return ["gzip"] + (["zstd"] if find_spec("zstandard") else [])
+
+
+@contextmanager
+def compressed(out: BinaryIO, compression: Optional[str] = None) -> Iterator[BinaryIO]:
+    """Yield a stream that compresses into ``out``; closing it finishes the frame, not ``out``."""
+    if not compression:
+        yield out
+        return
+    if compression not in COMPRESSORS:
+        raise ValueError(f"Unknown compression: {compression!r}")
+    stream = COMPRESSORS[compression][1](out)
+    try:
+        yield stream
+    finally:
+        stream.close()
+
+
+# Writers
+@contextmanager
+def _text(out: BinaryIO) -> Iterator[io.TextIOWrapper]:
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    try:
+        yield text
+    finally:
+        text.flush()
+        text.detach()
+
+
+def write_csv(rows: Iterable[Row], out: BinaryIO, compression: Optional[str] = None):
+    with compressed(out, compression) as stream, _text(stream) as text:
+        writer = csv.writer(text)
+        writer.writerow(EXPORT_COLUMNS)
+        writer.writerows(rows)
+
+
+def write_ndjson(rows: Iterable[Row], out: BinaryIO, compression: Optional[str] = None):
+    """Write one JSON object per line, keyed by column header."""
+    with compressed(out, compression) as stream, _text(stream) as text:
+        for row in rows:
+            text.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+            text.write("\n")
+
+
+def write_json(document: Dict, out: BinaryIO, compression: Optional[str] = None):
+    """Write a whole JSON document compactly (the nested form export)."""
+    with compressed(out, compression) as stream, _text(stream) as text:
+        json.dump(document, text, ensure_ascii=False, separators=(",", ":"))
+
+
+def _arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        (column, pa.int64() if column in INTEGER_COLUMNS else pa.string())
+        for column in EXPORT_COLUMNS
+    ])
+
+
+def _record_batch(schema, batch: List[Row]):
+    import pyarrow as pa
+
+    columns = list(zip(*batch))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+    )
+
+
+def write_parquet(rows: Iterable[Row], out: BinaryIO, compression: Optional[str] = None):
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    with pq.ParquetWriter(out, schema, compression=compression or "none") as writer:
+        for batch in _batches(rows, BATCH_ROWS):
+            writer.write_batch(_record_batch(schema, batch))
+
+
+def write_arrow(rows: Iterable[Row], out: BinaryIO, compression: Optional[str] = None):
+    """Write an Arrow IPC stream (readable with ``pyarrow.ipc.open_stream``)."""
+    import pyarrow as pa
+
+    schema = _arrow_schema()
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_stream(out, schema, options=options) as writer:
+        for batch in _batches(rows, BATCH_ROWS):
+            writer.write_batch(_record_batch(schema, batch))
+
+
+def write_xlsx(rows: Iterable[Row], out: BinaryIO, compression: Optional[str] = None):
+    """Write a workbook in openpyxl's write-only mode, starting a new sheet when one is full."""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = None
+    for count, row in enumerate(rows):
+        if count % XLSX_MAX_ROWS == 0:
+            sheet = workbook.create_sheet(f"Use Cases {count // XLSX_MAX_ROWS + 1}" if count else "Use Cases")
+            sheet.append(EXPORT_COLUMNS)
+        sheet.append(row)
+    if sheet is None:
+        workbook.create_sheet("Use Cases").append(EXPORT_COLUMNS)
+    workbook.save(out)
+
+
+class ExportFormat(NamedTuple):
+    label: str
+    extension: str
+    mime: str
+    writer: Callable[[Iterable[Row], BinaryIO, Optional[str]], None]
+    compressions: Tuple[str, ...]  # Codecs the format accepts
+    requires: Optional[str] = None  # Optional module the writer imports
+
+
+FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("CSV", ".csv", "text/csv", write_csv, ("gzip", "zstd")),
+    "ndjson": ExportFormat("NDJSON", ".ndjson", "application/x-ndjson", write_ndjson, ("gzip", "zstd")),
+    "parquet": ExportFormat("Parquet", ".parquet", "application/vnd.apache.parquet", write_parquet,
+                            ("gzip", "zstd"), "pyarrow"),
+    "arrow": ExportFormat("Arrow", ".arrows", "application/vnd.apache.arrow.stream", write_arrow,
+                          ("zstd",), "pyarrow"),
+    "xlsx": ExportFormat("Excel", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                         write_xlsx, (), "openpyxl"),
+}
+
+
+def available_formats() -> List[str]:
+    """Return the formats whose optional dependencies are installed."""
+    from importlib.util import find_spec
+
+    return [name for name, spec in FORMATS.items() if spec.requires is None or find_spec(spec.requires)]
+
+
+def supports(fmt: str, compression: Optional[str]) -> bool:
+    return not compression or compression in FORMATS[fmt].compressions
+
+
+def compressions_for(fmt: str) -> List[str]:
+    """Return the codecs ``fmt`` can use here (Parquet and Arrow bundle their own)."""
+    if fmt in STREAM_COMPRESSED:
+        return [name for name in FORMATS[fmt].compressions if name in available_compressions()]
+    return list(FORMATS[fmt].compressions)
+
+
+def file_name(stem: str, fmt: str, compression: Optional[str] = None) -> str:
+    """Return the download name; only stream-compressed formats get a compression suffix."""
+    name = stem + FORMATS[fmt].extension
+    if compression and fmt in STREAM_COMPRESSED:
+        name += COMPRESSORS[compression][0]
+    return name
+
+
+def mime_type(fmt: str, compression: Optional[str] = None) -> str:
+    if compression and fmt in STREAM_COMPRESSED:
+        return COMPRESSED_MIME[compression]
+    return FORMATS[fmt].mime
+
+
+def write_export(rows: Iterable[Row], fmt: str, out: BinaryIO, compression: Optional[str] = None):
+    """Write ``rows`` to ``out`` in format ``fmt``."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    if not supports(fmt, compression):
+        raise ValueError(f"{FORMATS[fmt].label} exports do not support {compression} compression")
+    FORMATS[fmt].writer(rows, out, compression)
+
+
+def export_bytes(rows: Iterable[Row], fmt: str, compression: Optional[str] = None) -> bytes:
+    buffer = io.BytesIO()
+    write_export(rows, fmt, buffer, compression)
+    return buffer.getvalue()
+
+
+def main() -> int:
+    from storage import DEFAULT_STORAGE_URL, open_storage
+
+    parser = argparse.ArgumentParser(description="Export every stored submission, one row per use case.")
+    parser.add_argument("path", help="Output file, or - for stdout")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--compression", choices=list(COMPRESSORS))
+    parser.add_argument("--storage", default=os.environ.get("AGENT_FORM_STORAGE", DEFAULT_STORAGE_URL),
+                        help="Storage URL (defaults to $AGENT_FORM_STORAGE)")
+    args = parser.parse_args()
+
+    storage = open_storage(args.storage)
+    try:
+        rows = submission_rows(storage.iter_submissions())
+        if args.path == "-":
+            write_export(rows, args.format, sys.stdout.buffer, args.compression)
+        else:
+            with open(args.path, "wb") as out:
+                write_export(rows, args.format, out, args.compression)
+    except (ValueError, ImportError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
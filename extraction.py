@@ -0,0 +1,328 @@
+"""Background text and table extraction for spooled documents.
+
+Each file is parsed in a worker process of its own, a bounded number at a
+time, so a large deck never blocks a rerun and a crash takes down only
+its worker. Successful results are written to disk next to the spool,
+keyed by the file's content digest, so a re-upload, a rerun or another
+server process never parses the same bytes twice. Failures are only kept
+in memory, so uploading the file again retries it.
+
+Workers run this module as a script:
+
+    python extraction.py <spooled file> <extension> <output.json>
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.etree import ElementTree
+
+from uploads import FileSpool, SpooledFile
+
+logger = logging.getLogger(__name__)
+
+MAX_TABLE_ROWS = 10000  # Rows kept per table; the full count is still reported
+CSV_CHUNK_ROWS = 5000
+WORKER_TIMEOUT = 300  # Seconds before a worker is killed and the file marked failed
+MAX_ATTEMPTS = 3  # Worker crashes tolerated per file before it is marked failed
+EXIT_UNREADABLE = 3  # Worker exit status when the file itself could not be extracted
+WORKER_PATH = os.path.abspath(__file__)
+
+# Extraction status values
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DRAWING_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+
+
+def _table(name: str, columns: List, rows: Iterable[List]) -> Dict:
+    kept = []
+    row_count = 0
+    for row in rows:
+        if row_count < MAX_TABLE_ROWS:
+            kept.append(["" if value is None else str(value) for value in row])
+        row_count += 1
+    return {"name": name, "columns": [str(column) for column in columns], "rows": kept, "row_count": row_count}
+
+
+def _extract_txt(path: str) -> Dict:
+    with open(path, encoding="utf-8", errors="replace") as handle:
+        return {"text": handle.read(), "tables": []}
+
+
+def _extract_csv(path: str) -> Dict:
+    import pandas as pd
+
+    try:
+        reader = pd.read_csv(path, chunksize=CSV_CHUNK_ROWS, dtype=str, keep_default_na=False)
+    except pd.errors.EmptyDataError:
+        return {"text": "", "tables": []}
+    with reader:
+        chunks = iter(reader)
+        first = next(chunks, None)
+        if first is None:
+            return {"text": "", "tables": []}
+        rows = chain.from_iterable(
+            chunk.itertuples(index=False, name=None) for chunk in chain([first], chunks)
+        )
+        return {"text": "", "tables": [_table("csv", list(first.columns), rows)]}
+
+
+def _extract_xlsx(path: str) -> Dict:
+    from openpyxl import load_workbook
+
+    # Spooled files have no extension, which openpyxl checks for paths
+    with open(path, "rb") as handle:
+        workbook = load_workbook(handle, read_only=True, data_only=True)
+        tables = []
+        try:
+            for sheet in workbook.worksheets:
+                rows = sheet.iter_rows(values_only=True)
+                header = next(rows, ())
+                tables.append(_table(sheet.title, list(header), rows))
+        finally:
+            workbook.close()
+    return {"text": "", "tables": tables}
+
+
+def _ooxml_part(archive: zipfile.ZipFile, member: str, ns: str) -> Tuple[str, List[List[List[str]]]]:
+    """Stream one OOXML part into its body text and its tables (rows of cell texts).
+
+    WordprocessingML and DrawingML name paragraphs, text runs and tables
+    alike (``p``, ``t``, ``tbl``/``tr``/``tc``), each in its own namespace.
+    Tables nested in a cell are read as that cell's text.
+    """
+    paragraph, run, table, row, cell = (f"{ns}{tag}" for tag in ("p", "t", "tbl", "tr", "tc"))
+    lines, tables = [], []
+    current: List[str] = []
+    cell_lines: List[str] = []
+    cells: List[str] = []
+    rows: List[List[str]] = []
+    depth = 0  # Table nesting
+    with archive.open(member) as handle:
+        for event, element in ElementTree.iterparse(handle, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == table:
+                    depth += 1
+                continue
+            if tag == run and element.text:
+                current.append(element.text)
+            elif tag == paragraph:
+                text = "".join(current)
+                current = []
+                if text:
+                    (cell_lines if depth else lines).append(text)
+                element.clear()
+            elif tag == cell and depth == 1:
+                cells.append("\n".join(cell_lines))
+                cell_lines = []
+            elif tag == row and depth == 1:
+                rows.append(cells)
+                cells = []
+            elif tag == table:
+                depth -= 1
+                if not depth:
+                    tables.append(rows)
+                    rows = []
+                    element.clear()
+    if current:
+        lines.append("".join(current))
+    return "\n".join(lines), tables
+
+
+def _named_tables(prefix: str, tables: List[List[List[str]]]) -> List[Dict]:
+    """Turn raw tables into result tables, taking each one's first row as its header."""
+    return [_table(f"{prefix} {number}", rows[0], rows[1:]) for number, rows in enumerate(tables, 1) if rows]
+
+
+def _extract_docx(path: str) -> Dict:
+    with zipfile.ZipFile(path) as archive:
+        text, tables = _ooxml_part(archive, "word/document.xml", _WORD_NS)
+    return {"text": text, "tables": _named_tables("Table", tables)}
+
+
+def _extract_pptx(path: str) -> Dict:
+    prefix = "ppt/slides/slide"
+    texts, tables = [], []
+    with zipfile.ZipFile(path) as archive:
+        slides = sorted(
+            int(name[len(prefix):-len(".xml")]) for name in archive.namelist()
+            if name.startswith(prefix) and name.endswith(".xml")
+        )
+        for slide in slides:
+            text, slide_tables = _ooxml_part(archive, f"{prefix}{slide}.xml", _DRAWING_NS)
+            texts.append(text)
+            tables += _named_tables(f"Slide {slide} table", slide_tables)
+    return {"text": "\n\n".join(texts), "tables": tables}
+
+
+def _extract_pdf(path: str) -> Dict:
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return {"text": "\n\n".join(page.extract_text() or "" for page in reader.pages), "tables": []}
+
+
+EXTRACTORS = {
+    "txt": _extract_txt,
+    "csv": _extract_csv,
+    "xlsx": _extract_xlsx,
+    "docx": _extract_docx,
+    "pptx": _extract_pptx,
+    "pdf": _extract_pdf,
+}
+
+
+def extract_file(path: str, extension: str) -> Dict:
+    """Extract text and tables from one file (runs in a worker process)."""
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: .{extension}")
+    return extractor(path)
+
+
+class ExtractionPipeline:
+    """Schedules extraction jobs and caches their results by content digest.
+
+    Workers are started as ``python extraction.py`` rather than through
+    multiprocessing, whose spawned children re-run the server's
+    ``__main__`` module, i.e. the whole Streamlit script.
+    """
+
+    def __init__(self, spool: FileSpool, max_workers: int = 2):
+        self.spool = spool
+        self.cache_dir = os.path.join(spool.root, "extracted")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Each thread waits on one worker process
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="agent-form-extract")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Future] = {}
+        self._summaries: Dict[str, Dict] = {}
+
+    def _cache_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def submit(self, ref: SpooledFile):
+        """Queue ``ref`` for extraction unless it is done or already running.
+
+        A file whose extraction failed is tried again, since the failure
+        may have been transient.
+        """
+        with self._lock:
+            if ref.digest in self._jobs:
+                return
+            summary = self._summaries.get(ref.digest)
+            if summary is not None and summary["status"] == DONE:
+                return
+            if summary is None and os.path.exists(self._cache_path(ref.digest)):
+                return
+            self._summaries.pop(ref.digest, None)
+            extension = os.path.splitext(ref.name)[1].lstrip(".").lower()
+            self._jobs[ref.digest] = self._executor.submit(self._extract, ref.digest, extension)
+
+    def _extract(self, digest: str, extension: str):
+        """Run workers until one succeeds, the file proves unreadable or MAX_ATTEMPTS crash."""
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            try:
+                worker = subprocess.run(
+                    [sys.executable, WORKER_PATH, self.spool.path(digest), extension, tmp_path],
+                    capture_output=True, text=True, timeout=WORKER_TIMEOUT,
+                )
+                if worker.returncode == 0:
+                    with open(tmp_path, encoding="utf-8") as handle:
+                        summary = self._summarize(json.load(handle))
+                    os.replace(tmp_path, self._cache_path(digest))
+                    self._finish(digest, summary)
+                    return
+                if worker.returncode == EXIT_UNREADABLE:
+                    error = worker.stderr.strip().splitlines()[-1] if worker.stderr.strip() else "unreadable file"
+                    break
+                # Killed (e.g. for memory) or crashed; not necessarily the file's fault
+                error = f"extraction worker exited with status {worker.returncode}"
+                logger.warning("Extraction of %s failed (attempt %d of %d): %s", digest, attempt, MAX_ATTEMPTS, error)
+            except subprocess.TimeoutExpired:
+                error = f"extraction took longer than {WORKER_TIMEOUT} seconds"
+                break
+            except Exception as exc:
+                error = str(exc)
+                break
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+        logger.warning("Extraction of %s failed: %s", digest, error)
+        self._finish(digest, {"status": FAILED, "chars": 0, "tables": 0, "error": error})
+
+    def _finish(self, digest: str, summary: Dict):
+        with self._lock:
+            self._summaries[digest] = summary
+            del self._jobs[digest]
+
+    @staticmethod
+    def _summarize(result: Dict) -> Dict:
+        return {
+            "status": FAILED if result.get("error") else DONE,
+            "chars": len(result.get("text", "")),
+            "tables": len(result.get("tables", [])),
+            "error": result.get("error"),
+        }
+
+    def status(self, ref: SpooledFile) -> Dict:
+        """Return ``{"status", "chars", "tables", "error"}`` for a document."""
+        with self._lock:
+            if ref.digest in self._jobs:
+                return {"status": PENDING, "chars": 0, "tables": 0, "error": None}
+            summary = self._summaries.get(ref.digest)
+        if summary is not None:
+            return summary
+        result = self.result(ref)
+        if result is None:
+            # Never scheduled in this process, e.g. restored from a draft
+            self.submit(ref)
+            return {"status": PENDING, "chars": 0, "tables": 0, "error": None}
+        summary = self._summarize(result)
+        with self._lock:
+            self._summaries[ref.digest] = summary
+        return summary
+
+    def result(self, ref: SpooledFile) -> Optional[Dict]:
+        """Return the cached extraction result, or None if it is not ready or failed."""
+        try:
+            with open(self._cache_path(ref.digest), encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Extract one spooled file (run by ExtractionPipeline).")
+    parser.add_argument("path")
+    parser.add_argument("extension")
+    parser.add_argument("output", help="JSON file to write the result to")
+    args = parser.parse_args()
+
+    try:
+        result = extract_file(args.path, args.extension)
+    except Exception as exc:
+        print(f"{type(exc).__name__}: {exc}", file=sys.stderr)
+        return EXIT_UNREADABLE
+    result["error"] = None
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(result, handle)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Headless HTTP API for programmatic submissions.
+
+Accepts the document ``export_data_as_json`` produces (or a JSON array of
+them), validates it with the same rules as the form and the bulk import,
+and stores it through the shared storage writer. The event loop only
+parses requests. Documents from concurrent requests are micro-batched and
+validated in one vectorized pass on a worker thread, and their writes are
+group-committed by the storage writer thread. Requests beyond
+``MAX_IN_FLIGHT`` pending submissions are turned away with 503 and
+``Retry-After`` rather than queued without bound.
+
+Run it next to the Streamlit app, against the same storage:
+
+    AGENT_FORM_INGEST_TOKEN=... python ingest.py --port 8600
+
+    curl -X POST -H "Authorization: Bearer $TOKEN" -H "Content-Type: application/json" \\
+         --data @agent_form_export.json http://127.0.0.1:8600/submissions
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import sys
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import metrics
+from bulk_import import validate_documents
+from storage import DEFAULT_STORAGE_URL, StorageBackend, open_storage
+
+# Settings
+STORAGE_URL = os.environ.get("AGENT_FORM_STORAGE", DEFAULT_STORAGE_URL)
+INGEST_TOKEN = os.environ.get("AGENT_FORM_INGEST_TOKEN", "")
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_BATCH_DOCUMENTS = 500  # Documents accepted per request
+MAX_IN_FLIGHT = 2000  # Submissions being validated or awaiting commit
+VALIDATION_BATCH = 500  # Documents validated together at most
+RETRY_AFTER_SECONDS = 1
+
+
+class Ingestor:
+    """Validates and stores submissions in micro-batches, bounding the work in flight.
+
+    Requests add their documents to a queue. A single batcher task takes
+    everything queued so far (up to ``batch_size`` documents) and validates
+    it on a worker thread, so batches grow with load instead of waiting on
+    a timer.
+    """
+
+    def __init__(self, storage: StorageBackend, max_in_flight: int = MAX_IN_FLIGHT,
+                 batch_size: int = VALIDATION_BATCH):
+        self.storage = storage
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.in_flight = 0  # Only touched on the event loop
+        # One thread: validation holds the GIL, so more would not run in parallel
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="agent-form-ingest")
+        self._pending: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._pending = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+
+    def reserve(self, count: int) -> bool:
+        """Claim capacity for ``count`` submissions; False when the server is saturated."""
+        if self.in_flight + count > self.max_in_flight:
+            return False
+        self.in_flight += count
+        return True
+
+    def release(self, count: int):
+        self.in_flight -= count
+
+    def _validate_and_queue(self, documents: List) -> List[Tuple[Dict, Optional[Future]]]:
+        """Validate documents and queue the valid ones for writing (runs on the worker thread)."""
+        outcomes = []
+        for payload, errors in validate_documents(documents):
+            if errors:
+                outcomes.append(({"status": "rejected", "errors": errors}, None))
+            else:
+                # The storage queue is bounded, so this blocks the worker, never the event loop
+                future = self.storage.save_submission(f"api-{uuid.uuid4().hex}", payload)
+                outcomes.append(({"status": "accepted"}, future))
+        return outcomes
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            size = len(batch[0][0])
+            while size < self.batch_size and not self._pending.empty():
+                batch.append(self._pending.get_nowait())
+                size += len(batch[-1][0])
+            documents = [document for request_documents, _ in batch for document in request_documents]
+            metrics.observe("ingest_batch_documents", len(documents))
+            try:
+                outcomes = await loop.run_in_executor(self._executor, self._validate_and_queue, documents)
+            except Exception as exc:
+                for _, waiter in batch:
+                    if not waiter.done():
+                        waiter.set_exception(exc)
+                continue
+            offset = 0
+            for request_documents, waiter in batch:
+                if not waiter.done():
+                    waiter.set_result(outcomes[offset:offset + len(request_documents)])
+                offset += len(request_documents)
+
+    async def submit(self, documents: List) -> List[Dict]:
+        """Validate and durably store ``documents``; return one result per document."""
+        waiter = asyncio.get_running_loop().create_future()
+        await self._pending.put((documents, waiter))
+        outcomes = await waiter
+        await asyncio.gather(*(asyncio.wrap_future(future) for _, future in outcomes if future is not None))
+        return [{"index": index, **result} for index, (result, _) in enumerate(outcomes)]
+
+    async def close(self):
+        if self._batcher is not None:
+            self._batcher.cancel()
+        self._executor.shutdown(wait=True)
+
+
+async def read_body(request: Request) -> Optional[bytes]:
+    """Read the request body, or return None once it exceeds ``MAX_BODY_BYTES``."""
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_BODY_BYTES:
+        return None
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_BYTES:
+            return None
+    return bytes(body)
+
+
+def authorized(request: Request, token: str) -> bool:
+    supplied = request.headers.get("authorization", "")
+    scheme, _, value = supplied.partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(value.encode(), token.encode())
+
+
+def create_app(storage_url: str = STORAGE_URL, token: str = INGEST_TOKEN,
+               max_in_flight: int = MAX_IN_FLIGHT) -> Starlette:
+    """Build the ASGI app; storage is opened on startup and flushed on shutdown."""
+    if not token:
+        raise ValueError("An ingestion token is required (set AGENT_FORM_INGEST_TOKEN).")
+    state: Dict[str, Ingestor] = {}
+
+    async def submissions(request: Request) -> JSONResponse:
+        if not authorized(request, token):
+            return JSONResponse({"error": "Invalid or missing bearer token."}, status_code=401)
+        body = await read_body(request)
+        if body is None:
+            return JSONResponse({"error": f"Request body exceeds {MAX_BODY_BYTES} bytes."}, status_code=413)
+        try:
+            document = json.loads(body)
+        except ValueError as exc:
+            return JSONResponse({"error": f"Invalid JSON: {exc}"}, status_code=400)
+        documents = document if isinstance(document, list) else [document]
+        if not documents or len(documents) > MAX_BATCH_DOCUMENTS:
+            return JSONResponse({"error": f"Send between 1 and {MAX_BATCH_DOCUMENTS} documents per request."},
+                                status_code=400)
+
+        ingestor = state["ingestor"]
+        if not ingestor.reserve(len(documents)):
+            metrics.inc("ingest_overloaded_total")
+            return JSONResponse({"error": "Too many submissions in flight; retry shortly."}, status_code=503,
+                                headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+        try:
+            with metrics.span("ingest_request"):
+                results = await ingestor.submit(documents)
+        finally:
+            ingestor.release(len(documents))
+
+        accepted = sum(result["status"] == "accepted" for result in results)
+        metrics.inc("ingest_accepted_total", accepted)
+        metrics.inc("ingest_rejected_total", len(results) - accepted)
+        if not isinstance(document, list):
+            if accepted:
+                return JSONResponse({"status": "accepted"}, status_code=201)
+            return JSONResponse({"status": "rejected", "errors": results[0]["errors"]}, status_code=422)
+        return JSONResponse({"accepted": accepted, "results": results}, status_code=201 if accepted else 422)
+
+    async def health(request: Request) -> JSONResponse:
+        ingestor = state["ingestor"]
+        return JSONResponse({"status": "ok", "in_flight": ingestor.in_flight,
+                             "max_in_flight": ingestor.max_in_flight})
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        storage = open_storage(storage_url)
+        ingestor = state["ingestor"] = Ingestor(storage, max_in_flight)
+        ingestor.start()
+        try:
+            yield
+        finally:
+            await ingestor.close()
+            storage.close()
+
+    return Starlette(
+        routes=[
+            Route("/submissions", submissions, methods=["POST"]),
+            Route("/health", health, methods=["GET"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def main() -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the programmatic submission API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--storage", default=STORAGE_URL, help="Storage URL (defaults to $AGENT_FORM_STORAGE)")
+    args = parser.parse_args()
+
+    try:
+        app = create_app(args.storage)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    if metrics.ENABLED:
+        metrics.start_exporter()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
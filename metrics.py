@@ -0,0 +1,241 @@
+"""In-process timing spans and histograms for the app's hot paths.
+
+Instrumentation is off unless ``AGENT_FORM_METRICS=1`` is set. When off,
+``span`` hands back a shared no-op object and ``timed`` returns the
+function unchanged, so the instrumented code pays next to nothing.
+
+When on, aggregates are kept in a process-wide registry and periodically
+written to a file (Prometheus text format, or JSON if the path ends in
+``.json``) that a local scraper can read, e.g. node_exporter's textfile
+collector. ``AGENT_FORM_METRICS_PORT`` additionally serves them over HTTP.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+
+ENABLED = os.environ.get("AGENT_FORM_METRICS", "").lower() in ("1", "true", "yes")
+METRICS_FILE = os.environ.get("AGENT_FORM_METRICS_FILE", "agent_form_metrics.prom")
+METRICS_PORT = os.environ.get("AGENT_FORM_METRICS_PORT")
+EXPORT_INTERVAL = 15.0  # Seconds between metrics file rewrites
+
+PREFIX = "agent_form"
+
+# Histogram bucket upper bounds per metric
+DURATION_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+COUNT_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BYTES_BUCKETS = tuple(1024 * 2 ** power for power in range(0, 16, 2))  # 1 KiB .. 1 GiB
+
+BUCKETS = {
+    "span_duration_ms": DURATION_BUCKETS,
+    "widgets_rendered": COUNT_BUCKETS,
+    "session_state_keys": COUNT_BUCKETS,
+    "ingest_batch_documents": COUNT_BUCKETS,
+    "session_state_bytes": BYTES_BUCKETS,
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    __slots__ = ("bounds", "buckets", "count", "total")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+
+    def cumulative(self):
+        running = 0
+        for bound, hits in zip(self.bounds, self.buckets):
+            running += hits
+            yield bound, running
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters and labelled histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+
+    def inc(self, name: str, amount: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(BUCKETS.get(name, DURATION_BUCKETS))
+            histogram.observe(value)
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {PREFIX}_{name} counter")
+                lines.append(f"{PREFIX}_{name} {value}")
+            declared = set()
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metric = f"{PREFIX}_{name}"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} histogram")
+                    declared.add(metric)
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                prefix = f"{label_text}," if label_text else ""
+                for bound, running in histogram.cumulative():
+                    lines.append(f'{metric}_bucket{{{prefix}le="{bound}"}} {running}')
+                lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{metric}_sum{suffix} {histogram.total}")
+                lines.append(f"{metric}_count{suffix} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        with self._lock:
+            histograms = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": histogram.total,
+                    "buckets": {str(bound): running for bound, running in histogram.cumulative()},
+                }
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+            return json.dumps({"counters": dict(self._counters), "histograms": histograms}, indent=2)
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Span:
+    """Times a block and records it under ``span_duration_ms{span=name}``."""
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0.0
+
+    def start(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def stop(self):
+        REGISTRY.observe("span_duration_ms", (time.perf_counter() - self.started) * 1000, span=self.name)
+
+    def __enter__(self) -> "Span":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def start(self):
+        return self
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str):
+    """Return a context manager timing the enclosed block."""
+    return Span(name) if ENABLED else _NOOP_SPAN
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorate a function so each call is recorded as a span."""
+    def decorator(func: Callable) -> Callable:
+        if not ENABLED:
+            return func
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inc(name: str, amount: float = 1):
+    if ENABLED:
+        REGISTRY.inc(name, amount)
+
+
+def observe(name: str, value: float, **labels):
+    if ENABLED:
+        REGISTRY.observe(name, value, **labels)
+
+
+def render(path: str = METRICS_FILE) -> str:
+    """Render the registry in the format implied by ``path``'s extension."""
+    return REGISTRY.to_json() if path.endswith(".json") else REGISTRY.to_prometheus()
+
+
+def _write_file(path: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as handle:
+        handle.write(render(path))
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        as_json = self.path.rstrip("/").endswith(".json")
+        body = (REGISTRY.to_json() if as_json else REGISTRY.to_prometheus()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json" if as_json else "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporter(path: str = METRICS_FILE, interval: float = EXPORT_INTERVAL,
+                   port: Optional[str] = METRICS_PORT):
+    """Start writing the metrics file (and serving HTTP if ``port`` is set)."""
+    if not ENABLED:
+        return
+
+    def write_loop():
+        while True:
+            time.sleep(interval)
+            _write_file(path)
+
+    threading.Thread(target=write_loop, name="agent-form-metrics", daemon=True).start()
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="agent-form-metrics-http", daemon=True).start()
@@ -0,0 +1,245 @@
+"""Declarative use case schema, compiled once per process.
+
+Every use case field is declared once in ``FIELDS``: its type, default,
+choices, whether it is required, its widget and its export header.
+``compile_schema`` turns the declarations into the lookup tables, widget
+builders, default resetters and the single-pass validator the app, the
+store, the bulk import and the exports read, so none of them lists the
+fields by hand.
+
+Deployments can add fields without code changes by pointing
+``AGENT_FORM_FIELDS`` at a JSON file holding a list of field objects, e.g.
+
+    [{"name": "cost_center", "label": "Cost Center", "kind": "text", "required": true},
+     {"name": "region", "label": "Region", "kind": "choice", "choices": ["EMEA", "APAC", "AMER"]}]
+
+Custom fields are appended after the built-in ones, in the form and in
+every export.
+"""
+import html
+import json
+import os
+from typing import Callable, Dict, List, Mapping, MutableMapping, NamedTuple, Optional, Tuple
+
+# Choices for the enumerated fields, in widget order
+LEVELS = ["High", "Medium", "Low"]
+FREQUENCIES = ["Daily", "Weekly", "Monthly", "Quarterly", "Rarely"]
+
+# Bounds of "score" fields
+SCORE_MIN, SCORE_MAX = 1, 10
+
+KINDS = ("text", "textarea", "score", "choice")
+LEFT, RIGHT = 0, 1  # Form columns
+
+# Attributes of UseCase records that fields cannot shadow
+RESERVED_NAMES = {"id", "section", "version", "get", "to_dict"}
+
+CUSTOM_FIELDS_PATH = os.environ.get("AGENT_FORM_FIELDS", "")
+
+
+class Field(NamedTuple):
+    """One use case field, as declared."""
+
+    name: str
+    label: str  # Form label; also used in validation messages
+    kind: str  # One of KINDS
+    default: object = ""
+    choices: Tuple[str, ...] = ()
+    required: bool = False
+    help: str = ""
+    column: int = LEFT
+    header: str = ""  # Export column header; defaults to the label
+    key_prefix: str = ""  # Widget key prefix; defaults to f"{name}_" (f"custom_{name}_" for custom fields)
+
+
+FIELDS = (
+    Field("use_case", "Use Case Title", "text", required=True, header="Use Case"),
+    Field("description", "Description", "textarea", required=True),
+    Field("current_process", "Current Process", "textarea",
+          help="Describe how this process is currently handled", key_prefix="current_"),
+    Field("value", "Business Value (1-10)", "score", default=5, column=RIGHT,
+          help="How valuable is this to the business?", header="Business Value"),
+    Field("impact", "User Impact (1-10)", "score", default=5, column=RIGHT,
+          help="How much will this impact users?", header="User Impact"),
+    Field("feasibility", "Feasibility", "choice", default="Medium", choices=tuple(LEVELS), column=RIGHT,
+          help="How feasible is this to implement?"),
+    Field("frequency", "Frequency", "choice", default="Daily", choices=tuple(FREQUENCIES), column=RIGHT,
+          help="How often is this process performed?"),
+    Field("complexity", "Complexity", "choice", default="Medium", choices=tuple(LEVELS), column=RIGHT,
+          help="How complex is this use case?"),
+    Field("risks", "Risks & Dependencies", "textarea", column=RIGHT,
+          help="List any risks or dependencies for this use case", header="Risks"),
+    Field("compliance", "Compliance Requirements", "textarea",
+          help="List any compliance or regulatory requirements", header="Compliance"),
+    Field("priority", "Priority", "choice", default="Medium", choices=tuple(LEVELS),
+          help="What is the priority level?"),
+)
+
+
+def _is_blank(value) -> bool:
+    return value is None or not str(value).strip()
+
+
+def _not_score(value) -> bool:
+    return isinstance(value, bool) or not isinstance(value, int) or not SCORE_MIN <= value <= SCORE_MAX
+
+
+def _not_in(choices: List[str]) -> Callable[[object], bool]:
+    allowed = frozenset(choices)
+    return lambda value: value not in allowed
+
+
+def _widget_builder(field: Field) -> Callable[[str], None]:
+    """Return a function rendering ``field``'s widget under a given key.
+
+    Widgets take their value from session state, which ``seed`` and
+    ``reset`` fill, so no builder passes a default of its own.
+    """
+    import streamlit as st
+
+    options = {"help": field.help or None}
+    if field.required:
+        # Required fields carry a styled label above a collapsed one
+        label_html = f'<p class="required-field">{html.escape(field.label)}</p>'
+        options["label_visibility"] = "collapsed"
+    else:
+        label_html = None
+
+    if field.kind == "text":
+        widget = st.text_input
+        args = (field.label,)
+    elif field.kind == "textarea":
+        widget = st.text_area
+        args = (field.label,)
+    elif field.kind == "score":
+        widget = st.slider
+        args = (field.label, SCORE_MIN, SCORE_MAX)
+    else:
+        widget = st.selectbox
+        args = (field.label, list(field.choices))
+
+    def build(key: str):
+        if label_html:
+            st.markdown(label_html, unsafe_allow_html=True)
+        widget(*args, key=key, **options)
+    return build
+
+
+class CompiledSchema:
+    """Lookup tables and per-field callables derived once from the declarations."""
+
+    def __init__(self, fields: Tuple[Field, ...], builtin: int):
+        self.fields = fields
+        self.custom = fields[builtin:]
+        self.names = tuple(field.name for field in fields)
+        self.defaults = {field.name: field.default for field in fields}
+        self.choices = {field.name: list(field.choices) for field in fields if field.kind == "choice"}
+        self.score_fields = tuple(field.name for field in fields if field.kind == "score")
+        self.headers = {field.name: field.header or field.label for field in fields}
+        self.key_prefixes = tuple(field.key_prefix or f"{field.name}_" for field in fields)
+        self._prefixed = tuple(zip(self.key_prefixes, fields))
+        # (name, message) of each required field, and the value rule message of typed fields
+        self.required = tuple((field.name, f"{field.label} is required") for field in fields if field.required)
+        self.messages = {
+            name: f"{self.headers[name]} must be a whole number from {SCORE_MIN} to {SCORE_MAX}"
+            for name in self.score_fields
+        }
+        self.messages.update({
+            name: f"{self.headers[name]} must be one of {', '.join(choices)}" for name, choices in self.choices.items()
+        })
+        # One (name, test, message) per rule, checked in a single pass by validate()
+        self._rules = tuple(
+            [(name, _is_blank, message) for name, message in self.required]
+            + [(name, _not_score, self.messages[name]) for name in self.score_fields]
+            + [(name, _not_in(choices), self.messages[name]) for name, choices in self.choices.items()]
+        )
+        self._builders: Optional[Tuple[Tuple[str, int, Callable[[str], None]], ...]] = None
+
+    # Form state, keyed f"{prefix}{section}"
+    def seed(self, state: MutableMapping, section: str):
+        """Give every widget of ``section`` its default unless it already has a value."""
+        for prefix, field in self._prefixed:
+            state.setdefault(prefix + section, field.default)
+
+    def reset(self, state: MutableMapping, section: str):
+        """Put every widget of ``section`` back to its default."""
+        for prefix, field in self._prefixed:
+            state[prefix + section] = field.default
+
+    def load(self, state: MutableMapping, section: str, case):
+        """Fill the widgets of ``section`` with a saved case's values, for editing it."""
+        for prefix, field in self._prefixed:
+            state[prefix + section] = case.get(field.name, field.default)
+
+    def read(self, state: Mapping, section: str) -> Dict:
+        """Return the field values entered for ``section``."""
+        return {field.name: state.get(prefix + section, field.default) for prefix, field in self._prefixed}
+
+    def validate(self, values: Mapping) -> List[str]:
+        """Return one message per broken rule (required, score range, choices) in ``values``."""
+        return [message for name, broken, message in self._rules if broken(values.get(name))]
+
+    def render(self, section: str, columns):
+        """Render every field's widget into ``columns`` (one container per form column)."""
+        if self._builders is None:
+            self._builders = tuple((prefix, field.column, _widget_builder(field))
+                                   for prefix, field in self._prefixed)
+        for prefix, column, build in self._builders:
+            with columns[column]:
+                build(prefix + section)
+
+
+def _custom_field(entry: Dict) -> Field:
+    if not isinstance(entry, dict):
+        raise ValueError("Each custom field must be a JSON object.")
+    unknown = set(entry) - set(Field._fields)
+    if unknown:
+        raise ValueError(f"Unknown custom field keys: {', '.join(sorted(unknown))}")
+    name = entry.get("name", "")
+    if not str(name).isidentifier() or name in RESERVED_NAMES:
+        raise ValueError(f"Invalid custom field name: {name!r}")
+    kind = entry.get("kind", "text")
+    if kind not in KINDS:
+        raise ValueError(f"Custom field {name!r} has unknown kind {kind!r}; use one of {', '.join(KINDS)}")
+    choices = tuple(str(choice) for choice in entry.get("choices", ()))
+    if kind == "choice" and not choices:
+        raise ValueError(f"Custom field {name!r} needs 'choices'.")
+    default = {"score": SCORE_MIN, "choice": choices[0] if choices else ""}.get(kind, "")
+    # Custom widget keys get their own namespace, so "current" cannot take current_process's "current_"
+    field = Field(**{"label": name.replace("_", " ").title(), "default": default, "key_prefix": f"custom_{name}_",
+                     **entry, "kind": kind, "choices": choices})
+    if field.column not in (LEFT, RIGHT):
+        raise ValueError(f"Custom field {name!r} has column {field.column!r}; use {LEFT} or {RIGHT}")
+    if kind == "choice" and field.default not in choices:
+        raise ValueError(f"Custom field {name!r} has a default that is not one of its choices.")
+    if kind == "score" and (not isinstance(field.default, int) or not SCORE_MIN <= field.default <= SCORE_MAX):
+        raise ValueError(f"Custom field {name!r} needs a whole-number default from {SCORE_MIN} to {SCORE_MAX}.")
+    return field
+
+
+def load_custom_fields(path: str) -> Tuple[Field, ...]:
+    """Read deployment-specific fields from a JSON file."""
+    with open(path, encoding="utf-8") as handle:
+        entries = json.load(handle)
+    if not isinstance(entries, list):
+        raise ValueError(f"{path} must contain a JSON list of field objects.")
+    return tuple(_custom_field(entry) for entry in entries)
+
+
+def compile_schema(custom: Tuple[Field, ...] = ()) -> CompiledSchema:
+    fields = FIELDS + tuple(custom)
+    names = [field.name for field in fields]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"Duplicate field names: {', '.join(sorted(duplicates))}")
+    # Widget keys are f"{prefix}{section}", so no prefix may start with another
+    prefixes = [(field.key_prefix or f"{field.name}_", field.name) for field in fields]
+    for position, (prefix, name) in enumerate(prefixes):
+        for other_prefix, other in prefixes[:position]:
+            if prefix.startswith(other_prefix) or other_prefix.startswith(prefix):
+                raise ValueError(f"Field {name!r} has widget key prefix {prefix!r}, "
+                                 f"which overlaps {other!r}'s {other_prefix!r}")
+    return CompiledSchema(fields, len(FIELDS))
+
+
+SCHEMA = compile_schema(load_custom_fields(CUSTOM_FIELDS_PATH) if CUSTOM_FIELDS_PATH else ())
@@ -0,0 +1,165 @@
+"""Composite prioritization scores and rankings for use cases.
+
+Each use case gets a 0-100 score from a weighted sum of its normalized
+value, impact, feasibility, frequency, complexity and priority. A full
+(re)build scores every case in one vectorized pandas/NumPy pass; after
+that, ``ScoreIndex`` listens to the store and keeps the overall and
+per-section rankings sorted incrementally as cases come and go.
+
+NumPy and pandas are imported on the first bulk rebuild rather than at
+module load, so a fresh session with an empty form never pays for them.
+"""
+from bisect import bisect_left, insort
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from schema import SCORE_MAX, SCORE_MIN
+from store import UseCase
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_WEIGHTS = {
+    "value": 0.30,
+    "impact": 0.25,
+    "feasibility": 0.15,
+    "frequency": 0.10,
+    "complexity": 0.10,
+    "priority": 0.10,
+}
+
+# Normalized 0-1 contribution of each enumerated answer
+LEVEL_SCORES = {"High": 1.0, "Medium": 0.5, "Low": 0.0}
+COMPLEXITY_SCORES = {"High": 0.0, "Medium": 0.5, "Low": 1.0}  # Simpler is better
+FREQUENCY_SCORES = {"Daily": 1.0, "Weekly": 0.75, "Monthly": 0.5, "Quarterly": 0.25, "Rarely": 0.0}
+
+FIELD_SCORES = {
+    "feasibility": LEVEL_SCORES,
+    "frequency": FREQUENCY_SCORES,
+    "complexity": COMPLEXITY_SCORES,
+    "priority": LEVEL_SCORES,
+}
+
+# Ranking entries sort by descending score, then by id (oldest first)
+RankKey = Tuple[float, int]
+
+
+def normalize_weights(weights: Dict[str, float]) -> Dict[str, float]:
+    """Scale weights to sum to 1, keeping only the known factors."""
+    weights = {field: max(float(weights.get(field, 0.0)), 0.0) for field in DEFAULT_WEIGHTS}
+    total = sum(weights.values()) or 1.0
+    return {field: weight / total for field, weight in weights.items()}
+
+
+def score_frame(frame: "pd.DataFrame", weights: Dict[str, float]) -> "pd.Series":
+    """Score every row of ``frame`` in one vectorized pass (0-100)."""
+    import numpy as np
+    import pandas as pd
+
+    weights = normalize_weights(weights)
+    span = SCORE_MAX - SCORE_MIN
+    factors = {
+        field: (pd.to_numeric(frame[field], errors="coerce").to_numpy(dtype=float) - SCORE_MIN) / span
+        for field in ("value", "impact")
+    }
+    for field, mapping in FIELD_SCORES.items():
+        factors[field] = frame[field].map(mapping).to_numpy(dtype=float)
+    matrix = np.column_stack([factors[field] for field in DEFAULT_WEIGHTS])
+    vector = np.array([weights[field] for field in DEFAULT_WEIGHTS])
+    scores = np.nan_to_num(matrix, nan=0.0) @ vector * 100
+    return pd.Series(scores.round(1), index=frame.index)
+
+
+def score_case(case: UseCase, weights: Dict[str, float]) -> float:
+    """Score a single use case with the same formula as ``score_frame``."""
+    span = SCORE_MAX - SCORE_MIN
+    factors = {
+        "value": (case.value - SCORE_MIN) / span,
+        "impact": (case.impact - SCORE_MIN) / span,
+    }
+    for field, mapping in FIELD_SCORES.items():
+        factors[field] = mapping.get(getattr(case, field), 0.0)
+    return round(sum(weights[field] * factors[field] for field in DEFAULT_WEIGHTS) * 100, 1)
+
+
+class ScoreIndex:
+    """Scores plus overall and per-section rankings, kept sorted incrementally."""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, top_n: int = 10):
+        self.weights = normalize_weights(weights or DEFAULT_WEIGHTS)
+        self.top_n = top_n
+        self._scores: Dict[int, float] = {}
+        self._sections: Dict[int, str] = {}
+        self._overall: List[RankKey] = []
+        self._by_section: Dict[str, List[RankKey]] = {}
+        # Bumped only when the overall top-N changes, so views of the
+        # leaderboard can skip rerendering for changes further down
+        self.top_version = 0
+
+    def rebuild(self, cases: Iterable[UseCase]):
+        """Rescore every case in one vectorized pass and re-sort the rankings."""
+        cases = list(cases)
+        scores = []
+        if cases:
+            import pandas as pd
+
+            frame = pd.DataFrame({
+                field: [getattr(case, field) for case in cases] for field in DEFAULT_WEIGHTS
+            })
+            scores = score_frame(frame, self.weights).tolist()
+        self._scores = {case.id: score for case, score in zip(cases, scores)}
+        self._sections = {case.id: case.section for case in cases}
+        self._overall = sorted((-score, case.id) for case, score in zip(cases, scores))
+        self._by_section = {}
+        for key in self._overall:
+            self._by_section.setdefault(self._sections[key[1]], []).append(key)
+        self.top_version += 1
+
+    def set_weights(self, weights: Dict[str, float], cases: Iterable[UseCase]):
+        """Change the weights; every score changes, so rebuild in bulk."""
+        self.weights = normalize_weights(weights)
+        self.rebuild(cases)
+
+    # Store listener interface
+    def case_added(self, case: UseCase):
+        score = score_case(case, self.weights)
+        key = (-score, case.id)
+        self._scores[case.id] = score
+        self._sections[case.id] = case.section
+        if bisect_left(self._overall, key) < self.top_n:
+            self.top_version += 1
+        insort(self._overall, key)
+        insort(self._by_section.setdefault(case.section, []), key)
+
+    def case_removed(self, case: UseCase):
+        score = self._scores.pop(case.id, None)
+        if score is None:
+            return
+        key = (-score, case.id)
+        position = bisect_left(self._overall, key)
+        del self._overall[position]
+        if position < self.top_n:
+            self.top_version += 1
+        section = self._sections.pop(case.id)
+        ranking = self._by_section[section]
+        del ranking[bisect_left(ranking, key)]
+        if not ranking:
+            del self._by_section[section]
+
+    # Queries
+    def score(self, case_id: int) -> Optional[float]:
+        return self._scores.get(case_id)
+
+    def rank(self, case_id: int) -> Optional[int]:
+        """Return the 1-based overall rank of a case."""
+        score = self._scores.get(case_id)
+        if score is None:
+            return None
+        return bisect_left(self._overall, (-score, case_id)) + 1
+
+    def top(self, n: Optional[int] = None) -> List[int]:
+        """Return the ids of the highest-scoring cases overall."""
+        return [case_id for _, case_id in self._overall[:n or self.top_n]]
+
+    def section_order(self, section: str) -> Iterator[int]:
+        """Iterate over a section's case ids, best first."""
+        return (case_id for _, case_id in self._by_section.get(section, []))
@@ -0,0 +1,185 @@
+"""Full-text search over use case text fields.
+
+Within a session, ``SearchIndex`` listens to the store and keeps an
+inverted index (token -> case id -> weight) plus a sorted vocabulary for
+prefix lookups, so each add or delete touches only that case's tokens.
+Stored submissions are indexed in an SQLite FTS5 table maintained in the
+same write transaction as the analytics rollups.
+"""
+import math
+import re
+import sqlite3
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from analytics import fold_new_submissions
+from store import UseCase
+
+# Searchable fields and how much a hit in each counts
+FIELD_WEIGHTS = {
+    "use_case": 3.0,
+    "description": 1.5,
+    "current_process": 1.0,
+    "risks": 1.0,
+    "compliance": 1.0,
+}
+MIN_PREFIX = 2  # Shorter query terms only match whole tokens
+PREFIX_PENALTY = 0.5  # A prefix-only hit counts half as much as a whole-token hit
+
+_TOKEN = re.compile(r"\w+")
+
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS submission_search USING fts5(
+    use_case, description, current_process, risks, compliance,
+    section UNINDEXED, priority UNINDEXED, business_name UNINDEXED, submission_id UNINDEXED,
+    prefix = '2 3 4', tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(str(text).lower())
+
+
+def case_terms(case: UseCase) -> Dict[str, float]:
+    """Return each token of a case with its field-weighted frequency."""
+    weights: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(case, field) or ""):
+            weights[token] += weight
+    return weights
+
+
+class SearchIndex:
+    """In-memory inverted index over the use cases of one store."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocabulary: List[str] = []  # Sorted, for prefix ranges
+        self._terms: Dict[int, Tuple[str, ...]] = {}
+        self._meta: Dict[int, Tuple[str, str]] = {}  # case id -> (section, priority)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def rebuild(self, cases: Iterable[UseCase]):
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._terms.clear()
+        self._meta.clear()
+        for case in cases:
+            self.case_added(case)
+
+    # Store listener interface
+    def case_added(self, case: UseCase):
+        terms = case_terms(case)
+        for token, weight in terms.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                insort(self._vocabulary, token)
+            postings[case.id] = weight
+        self._terms[case.id] = tuple(terms)
+        self._meta[case.id] = (case.section, case.priority)
+
+    def case_removed(self, case: UseCase):
+        for token in self._terms.pop(case.id, ()):
+            postings = self._postings[token]
+            del postings[case.id]
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+        self._meta.pop(case.id, None)
+
+    # Queries
+    def _expand(self, term: str) -> List[str]:
+        """Return the indexed tokens a query term matches."""
+        if len(term) < MIN_PREFIX:
+            return [term] if term in self._postings else []
+        start = bisect_left(self._vocabulary, term)
+        end = bisect_left(self._vocabulary, term + "\uffff", start)
+        return self._vocabulary[start:end]
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        """Score every case matching one query term (best expansion wins)."""
+        total = len(self._terms)
+        scores: Dict[int, float] = {}
+        for token in self._expand(term):
+            postings = self._postings[token]
+            idf = math.log(1 + total / len(postings))
+            factor = idf if token == term else idf * PREFIX_PENALTY
+            for case_id, weight in postings.items():
+                score = weight * factor
+                if score > scores.get(case_id, 0.0):
+                    scores[case_id] = score
+        return scores
+
+    def search(self, query: str, section: Optional[str] = None, priority: Optional[str] = None,
+               limit: int = 20) -> List[Tuple[int, float]]:
+        """Return ``(case_id, score)`` for cases matching every query term, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        # Intersect starting from the rarest term to keep candidate sets small
+        per_term = sorted((self._term_scores(term) for term in terms), key=len)
+        candidates = per_term[0]
+        for scores in per_term[1:]:
+            candidates = {case_id: score + scores[case_id]
+                          for case_id, score in candidates.items() if case_id in scores}
+            if not candidates:
+                return []
+        if section or priority:
+            candidates = {
+                case_id: score for case_id, score in candidates.items()
+                if (not section or self._meta[case_id][0] == section)
+                and (not priority or self._meta[case_id][1] == priority)
+            }
+        ranked = sorted(candidates.items(), key=lambda item: (-item[1], item[0]))
+        return [(case_id, round(score, 2)) for case_id, score in ranked[:limit]]
+
+
+# Stored submissions (SQLite FTS5)
+def _index_submissions(conn: sqlite3.Connection, submissions: List[Tuple[int, Dict, float]]):
+    conn.executemany(
+        "INSERT INTO submission_search (use_case, description, current_process, risks, compliance, "
+        "section, priority, business_name, submission_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (*(str(case.get(field) or "") for field in FIELD_WEIGHTS),
+             section, case.get("priority", ""), payload.get("business_name", ""), submission_id)
+            for submission_id, payload, _ in submissions
+            for section, cases in (payload.get("target_sections") or {}).items()
+            for case in cases
+        ],
+    )
+
+
+def refresh_search_index(conn: sqlite3.Connection) -> int:
+    """Index every submission not yet in the FTS table (inside a write transaction)."""
+    return fold_new_submissions(conn, "search_watermark", _index_submissions)
+
+
+def match_expression(query: str) -> str:
+    """Build an FTS5 query requiring every term, matched as a prefix when long enough."""
+    return " AND ".join(
+        f'"{term}"*' if len(term) >= MIN_PREFIX else f'"{term}"'
+        for term in dict.fromkeys(tokenize(query))
+    )
+
+
+def search_submissions(conn: sqlite3.Connection, query: str, section: Optional[str] = None,
+                       priority: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """Return stored use cases matching ``query``, best first."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    weights = ", ".join(str(weight) for weight in FIELD_WEIGHTS.values())
+    cursor = conn.execute(
+        f"SELECT submission_id, business_name, section, use_case, priority, "
+        f"-bm25(submission_search, {weights}) AS score FROM submission_search "
+        "WHERE submission_search MATCH ? AND (? = '' OR section = ?) AND (? = '' OR priority = ?) "
+        "ORDER BY score DESC LIMIT ?",
+        (expression, section or "", section or "", priority or "", priority or "", limit),
+    )
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor]
@@ -0,0 +1,163 @@
+"""Session-state housekeeping: orphaned key cleanup, memory reports and caps.
+
+Streamlit keeps every ``st.session_state`` key until the session ends, and
+keys assigned from callbacks (e.g. form resets) are never treated as stale
+widgets. Deleting a section therefore has to purge the section's widget
+keys explicitly. Memory per session is measured by walking the state graph
+and reported to a process-wide registry, so operators can see which live
+sessions are largest.
+"""
+import sys
+import threading
+import time
+from types import FunctionType, ModuleType
+from typing import Dict, Iterable, List, MutableMapping, NamedTuple, Optional, Tuple
+
+from schema import SCHEMA
+
+# Control keys created once per section as f"{prefix}{section}"
+CONTROL_KEY_PREFIXES = (
+    "visible_cases_", "sort_by_score_", "more_cases_",
+    "del_sec_", "add_another_", "add_case_", "duplicates_",
+    "editing_", "save_edit_", "cancel_edit_",
+)
+# Per-case buttons are keyed f"{prefix}{section}_{case_id}"
+CASE_KEY_PREFIXES = ("del_case_", "edit_case_")
+# Every key a section owns, field widgets included
+SECTION_KEY_PREFIXES = SCHEMA.key_prefixes + CONTROL_KEY_PREFIXES
+
+# A field prefix overlapping a control prefix would let one section's keys pass for another's
+_overlaps = [(field, control) for field in SCHEMA.key_prefixes for control in CONTROL_KEY_PREFIXES + CASE_KEY_PREFIXES
+             if field.startswith(control) or control.startswith(field)]
+if _overlaps:
+    raise ValueError(f"Field widget key prefix {_overlaps[0][0]!r} overlaps the control prefix {_overlaps[0][1]!r}")
+
+# Objects shared by every session; never counted towards one session's size
+_SHARED_TYPES = (type, ModuleType, FunctionType)
+
+
+def case_keys(section: str, case_id: int) -> List[str]:
+    return [f"{prefix}{section}_{case_id}" for prefix in CASE_KEY_PREFIXES]
+
+
+def section_keys(state: Iterable[str], section: str) -> List[str]:
+    """Return the keys in ``state`` that belong to ``section``'s widgets."""
+    exact = {prefix + section for prefix in SECTION_KEY_PREFIXES}
+    case_prefixes = tuple(f"{prefix}{section}_" for prefix in CASE_KEY_PREFIXES)
+    return [
+        key for key in state
+        if key in exact
+        # The id suffix check keeps "HR" from claiming "HR_2"'s buttons
+        or any(key.startswith(prefix) and key[len(prefix):].isdigit() for prefix in case_prefixes)
+    ]
+
+
+def purge_section_keys(state: MutableMapping, section: str) -> int:
+    """Delete every widget key of ``section``; return how many were removed."""
+    keys = section_keys(list(state.keys()), section)
+    for key in keys:
+        del state[key]
+    return len(keys)
+
+
+def purge_case_keys(state: MutableMapping, section: str, case_id: int):
+    for key in case_keys(section, case_id):
+        if key in state:
+            del state[key]
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """Approximate the bytes reachable from ``obj``, each object counted once.
+
+    Pass the same ``seen`` set across calls to attribute shared objects to
+    whichever root reaches them first.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _SHARED_TYPES):
+            continue
+        seen.add(id(current))
+        memory_usage = getattr(current, "memory_usage", None)
+        if callable(memory_usage) and hasattr(current, "dtypes"):
+            # pandas objects report their buffers themselves
+            usage = memory_usage(deep=True)
+            total += int(usage.sum() if hasattr(usage, "sum") else usage)
+            continue
+        total += sys.getsizeof(current, 0)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif not isinstance(current, (str, bytes, bytearray, int, float, complex, bool)):
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for klass in type(current).__mro__:
+                for slot in klass.__dict__.get("__slots__", ()):
+                    if hasattr(current, slot):
+                        stack.append(getattr(current, slot))
+    return total
+
+
+class SessionReport(NamedTuple):
+    """A point-in-time measurement of one session's state."""
+
+    session_id: str
+    total_bytes: int
+    keys: int
+    sections: int
+    use_cases: int
+    largest_keys: Tuple[Tuple[str, int], ...]
+    measured_at: float
+
+
+def measure_session(session_id: str, state: Dict, sections: int, use_cases: int,
+                    top_keys: int = 5) -> SessionReport:
+    """Measure a snapshot of a session's state (e.g. ``st.session_state.to_dict()``)."""
+    seen: set = set()
+    sizes = {key: deep_sizeof(value, seen) for key, value in state.items()}
+    largest = tuple(sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:top_keys])
+    return SessionReport(session_id, sum(sizes.values()), len(sizes), sections, use_cases,
+                         largest, time.time())
+
+
+class SessionRegistry:
+    """Latest report of every live session in this server process."""
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._reports: Dict[str, SessionReport] = {}
+
+    def update(self, report: SessionReport):
+        with self._lock:
+            self._reports[report.session_id] = report
+
+    def get(self, session_id: str) -> Optional[SessionReport]:
+        with self._lock:
+            return self._reports.get(session_id)
+
+    def prune(self):
+        """Forget sessions that have not reported within ``ttl`` seconds."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for session_id in [sid for sid, report in self._reports.items() if report.measured_at < cutoff]:
+                del self._reports[session_id]
+
+    def largest(self, n: int = 10) -> List[SessionReport]:
+        self.prune()
+        with self._lock:
+            reports = list(self._reports.values())
+        return sorted(reports, key=lambda report: report.total_bytes, reverse=True)[:n]
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(report.total_bytes for report in self._reports.values())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._reports)
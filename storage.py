@@ -0,0 +1,329 @@
+"""Durable storage for form drafts and submissions.
+
+Backends are looked up by URL scheme (``sqlite:///agent_form.db``). The
+default SQLite backend runs in WAL mode so several Streamlit worker
+processes can share one database file: reads use a per-thread connection
+pool and never wait on writers, while all writes are queued to a single
+background thread that commits them in batches. Submissions are folded
+into the analytics rollups (analytics.py), the full-text index (search.py)
+and the near-duplicate index (dedup.py) in the same transaction.
+"""
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+import analytics
+import dedup
+import search
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORAGE_URL = "sqlite:///agent_form.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS drafts (
+    draft_id TEXT PRIMARY KEY,
+    business_name TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    draft_id TEXT,
+    business_name TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL,
+    submitted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_submissions_business ON submissions (business_name);
+"""
+
+
+class StorageBackend:
+    """Interface every storage backend implements."""
+
+    def save_draft(self, draft_id: str, payload: Dict) -> Future:
+        """Queue a draft autosave; later saves of the same draft supersede it."""
+        raise NotImplementedError
+
+    def load_draft(self, draft_id: str) -> Optional[Dict]:
+        """Return the latest saved draft payload, or None."""
+        raise NotImplementedError
+
+    def save_submission(self, draft_id: str, payload: Dict) -> Future:
+        """Queue a final submission and retire its draft."""
+        raise NotImplementedError
+
+    def draft_documents(self) -> Set[str]:
+        """Return the digests of the spooled documents attached to saved drafts."""
+        raise NotImplementedError
+
+    def iter_submissions(self, after_id: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """Yield ``(submission_id, payload)`` pairs in id order."""
+        raise NotImplementedError
+
+    def totals(self) -> Dict:
+        """Return submission, use case and business totals across all submissions."""
+        raise NotImplementedError
+
+    def rollup(self, dimension: str, limit: Optional[int] = None) -> List[Dict]:
+        """Return the aggregates for one dimension (see ``analytics.DIMENSIONS``)."""
+        raise NotImplementedError
+
+    def top_cases(self, limit: int = 20, **filters) -> List[Dict]:
+        """Return the highest-scoring submitted use cases matching ``filters``."""
+        raise NotImplementedError
+
+    def search_cases(self, query: str, section: Optional[str] = None, priority: Optional[str] = None,
+                     limit: int = 20) -> List[Dict]:
+        """Return submitted use cases matching every term of ``query``, best first."""
+        raise NotImplementedError
+
+    def similar_submitted_cases(self, use_case: str, description: str, limit: int = 5) -> List[Dict]:
+        """Return submitted use cases that are likely near-duplicates of the given text."""
+        raise NotImplementedError
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until every queued write has been committed."""
+
+    def close(self):
+        """Flush pending writes and release resources."""
+
+
+class SQLiteStorage(StorageBackend):
+    """SQLite (WAL) backend with a batched background writer."""
+
+    def __init__(self, path: str, batch_size: int = 200, flush_interval: float = 0.5,
+                 max_pending: int = 10000, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA + analytics.ROLLUP_SCHEMA + search.SEARCH_SCHEMA + dedup.DEDUP_SCHEMA)
+        # Backfill derived tables for submissions stored before they existed
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            folded = self._refresh_derived(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if folded:
+            logger.info("Folded %d stored submissions into the rollups and indexes", folded)
+        conn.close()
+
+        self._writer = threading.Thread(target=self._write_loop, name="agent-form-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None,
+                               check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={self.busy_timeout_ms}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return this thread's pooled read connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _refresh_derived(conn: sqlite3.Connection) -> int:
+        """Bring the rollups and indexes up to date; return submissions folded."""
+        return max(analytics.refresh_rollups(conn), search.refresh_search_index(conn),
+                   dedup.refresh_dedup_index(conn))
+
+    # Writes
+    def _enqueue(self, op: str, draft_id: str, payload: Optional[Dict]) -> Future:
+        if self._closed:
+            raise RuntimeError("Storage is closed")
+        future: Future = Future()
+        # Blocks only when the writer is far behind, which applies backpressure
+        self._queue.put((op, draft_id, payload, time.time(), future))
+        return future
+
+    def save_draft(self, draft_id: str, payload: Dict) -> Future:
+        return self._enqueue("draft", draft_id, payload)
+
+    def save_submission(self, draft_id: str, payload: Dict) -> Future:
+        return self._enqueue("submission", draft_id, payload)
+
+    def flush(self, timeout: Optional[float] = None):
+        if self._closed:
+            return
+        self._enqueue("flush", "", None).result(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    def _next_batch(self) -> Optional[List[Tuple]]:
+        """Wait for one write, then collect more until the batch is full or stale."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            if item[0] == "flush":
+                break
+        return batch
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                conn.close()
+                return
+            try:
+                self._commit(conn, batch)
+            except Exception as exc:
+                logger.exception("Failed to write %d queued operations", len(batch))
+                for item in batch:
+                    item[-1].set_exception(exc)
+            else:
+                for item in batch:
+                    item[-1].set_result(True)
+
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple]):
+        # Only the newest autosave of each draft needs writing
+        drafts: Dict[str, Tuple[Dict, float]] = {}
+        submissions = []
+        for op, draft_id, payload, ts, _ in batch:
+            if op == "draft":
+                drafts[draft_id] = (payload, ts)
+            elif op == "submission":
+                drafts.pop(draft_id, None)
+                submissions.append((draft_id, payload, ts))
+
+        if not drafts and not submissions:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO drafts (draft_id, business_name, payload, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(draft_id) DO UPDATE SET business_name = excluded.business_name, "
+                "payload = excluded.payload, updated_at = excluded.updated_at",
+                [(draft_id, payload.get("business_name", ""), json.dumps(payload), ts)
+                 for draft_id, (payload, ts) in drafts.items()],
+            )
+            conn.executemany(
+                "INSERT INTO submissions (draft_id, business_name, payload, submitted_at) VALUES (?, ?, ?, ?)",
+                [(draft_id, payload.get("business_name", ""), json.dumps(payload), ts)
+                 for draft_id, payload, ts in submissions],
+            )
+            conn.executemany("DELETE FROM drafts WHERE draft_id = ?",
+                             [(draft_id,) for draft_id, _, _ in submissions])
+            if submissions:
+                self._refresh_derived(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # Reads
+    def load_draft(self, draft_id: str) -> Optional[Dict]:
+        row = self._reader().execute(
+            "SELECT payload FROM drafts WHERE draft_id = ?", (draft_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def draft_documents(self) -> Set[str]:
+        rows = self._reader().execute(
+            "SELECT DISTINCT json_extract(document.value, '$.digest') "
+            "FROM drafts, json_each(drafts.payload, '$.documents') AS document"
+        )
+        return {digest for digest, in rows if digest}
+
+    def iter_submissions(self, after_id: int = 0) -> Iterator[Tuple[int, Dict]]:
+        cursor = self._reader().execute(
+            "SELECT id, payload FROM submissions WHERE id > ? ORDER BY id", (after_id,)
+        )
+        for submission_id, payload in cursor:
+            yield submission_id, json.loads(payload)
+
+    def totals(self) -> Dict:
+        return analytics.totals(self._reader())
+
+    def rollup(self, dimension: str, limit: Optional[int] = None) -> List[Dict]:
+        return analytics.rollup(self._reader(), dimension, limit)
+
+    def top_cases(self, limit: int = 20, **filters) -> List[Dict]:
+        return analytics.top_cases(self._reader(), limit, **filters)
+
+    def search_cases(self, query: str, section: Optional[str] = None, priority: Optional[str] = None,
+                     limit: int = 20) -> List[Dict]:
+        return search.search_submissions(self._reader(), query, section, priority, limit)
+
+    def similar_submitted_cases(self, use_case: str, description: str, limit: int = 5) -> List[Dict]:
+        return dedup.similar_submissions(self._reader(), use_case, description, limit=limit)
+
+
+def _open_sqlite(url) -> SQLiteStorage:
+    # sqlite:///relative.db and sqlite:////absolute/path.db
+    path = url.path[1:]
+    if not path or path == ":memory:":
+        # Each connection (per reader thread, plus the writer) would get its own empty database
+        raise ValueError("SQLite storage needs a database file path, e.g. sqlite:///agent_form.db")
+    return SQLiteStorage(path)
+
+
+BACKENDS = {
+    "sqlite": _open_sqlite,
+}
+
+# Backends opened by shared_storage, one per URL per process
+_shared: Dict[str, StorageBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def open_storage(url: str = DEFAULT_STORAGE_URL) -> StorageBackend:
+    """Open the storage backend named by ``url``'s scheme."""
+    parsed = urlparse(url)
+    if parsed.scheme not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {parsed.scheme!r}")
+    return BACKENDS[parsed.scheme](parsed)
+
+
+def shared_storage(url: str = DEFAULT_STORAGE_URL) -> StorageBackend:
+    """Return this process's backend for ``url``, opening it on first use.
+
+    Every caller in a server process goes through here, so they share one
+    reader pool and one writer thread instead of each opening its own.
+    """
+    with _shared_lock:
+        if url not in _shared:
+            _shared[url] = open_storage(url)
+        return _shared[url]
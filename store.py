@@ -0,0 +1,350 @@
+"""Id-keyed in-memory store for target sections and their use cases."""
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from schema import SCHEMA
+
+# Use case fields in display/export order, with their form defaults (see schema.py)
+CASE_FIELDS = SCHEMA.names
+CASE_DEFAULTS = SCHEMA.defaults
+
+# Choices for the enumerated fields, in widget order
+CASE_CHOICES = SCHEMA.choices
+
+# 1-10 score fields
+SCORE_FIELDS = SCHEMA.score_fields
+
+# Submission-level rules, shared by the form and the ingestion API
+BUSINESS_NAME_REQUIRED = "Business/Institution Name is required"
+SECTION_REQUIRED = "At least one target section is required"
+USE_CASE_REQUIRED = "At least one use case is required"
+
+# CSV column headers, shared by the export and the bulk import
+CSV_HEADERS = SCHEMA.headers
+
+HISTORY_LIMIT = 200  # Undoable edits kept per store
+
+
+class UseCase:
+    """A single use case record with a stable id."""
+
+    __slots__ = ("id", "section", "version") + CASE_FIELDS
+
+    def __init__(self, case_id: int, section: str, **fields):
+        self.id = case_id
+        self.section = section
+        self.version = 0
+        for field in CASE_FIELDS:
+            setattr(self, field, fields.get(field, CASE_DEFAULTS[field]))
+
+    def get(self, field: str, default=None):
+        """Dict-style field access, so records can stand in for the old case dicts."""
+        return getattr(self, field, default)
+
+    def to_dict(self) -> Dict:
+        """Return the use case fields as a plain dict (export schema)."""
+        return {field: getattr(self, field) for field in CASE_FIELDS}
+
+
+class Edit(NamedTuple):
+    """One undoable change: the records and sections it took out and put in.
+
+    Records are never modified once stored (``update`` stores a new record
+    under the same id), so an edit holds references to records the store
+    or other edits already hold rather than copies of them.
+    """
+
+    label: str
+    removed: Tuple[UseCase, ...] = ()
+    added: Tuple[UseCase, ...] = ()
+    sections_removed: Tuple[Tuple[str, int], ...] = ()  # (section, position)
+    sections_added: Tuple[Tuple[str, int], ...] = ()
+
+    def merge(self, other: "Edit") -> "Edit":
+        return Edit(self.label, self.removed + other.removed, self.added + other.added,
+                    self.sections_removed + other.sections_removed, self.sections_added + other.sections_added)
+
+
+class UseCaseStore:
+    """Sections of use cases with O(1) insert, delete and lookup by id.
+
+    Each section maps case ids to records in insertion order, and the store
+    keeps running counters so callers never need to scan every section to
+    answer "how many" or "are there any" questions.
+
+    Derived indexes register as listeners and are told about every insert
+    and removal through ``case_added(case)`` / ``case_removed(case)``, so
+    they can update incrementally instead of rescanning the store.
+
+    Every change is recorded as an ``Edit`` for ``undo``/``redo``. Undoing
+    replays an edit's records in reverse, so it costs as much as the edit
+    did, whatever the size of the form. Records restored before later ones
+    go back to their place lazily, on the next read of their section.
+    """
+
+    def __init__(self):
+        self._sections: Dict[str, Dict[int, UseCase]] = {}
+        self._index: Dict[int, UseCase] = {}
+        self._next_id = 1
+        self._nonempty_sections = 0
+        self._listeners: List = []
+        # Bumped when sections are added or removed
+        self.sections_version = 0
+        # Section display order, and what a restore put out of order
+        self._positions: Dict[str, int] = {}
+        self._next_position = 0
+        self._sections_unsorted = False
+        self._unsorted_cases: Set[str] = set()
+        # Edit history
+        self._undo: Deque[Edit] = deque(maxlen=HISTORY_LIMIT)
+        self._redo: List[Edit] = []
+        self._group: Optional[List[Edit]] = None
+
+    @classmethod
+    def from_dict(cls, target_sections: Dict[str, List[Dict]]) -> "UseCaseStore":
+        """Build a store from the ``{section: [case dict, ...]}`` layout."""
+        store = cls()
+        for section, rows in target_sections.items():
+            store.add_many(section, rows)
+        store.clear_history()
+        return store
+
+    def add_listener(self, listener):
+        """Register an index to be notified of every insert and removal."""
+        self._listeners.append(listener)
+
+    # Sections
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def __contains__(self, section: str) -> bool:
+        return section in self._sections
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._ordered_sections())
+
+    def sections(self) -> List[str]:
+        """Return the section names in insertion order."""
+        return list(self._ordered_sections())
+
+    def add_section(self, section: str) -> bool:
+        """Add an empty section; return False if it already exists."""
+        if section in self._sections:
+            return False
+        position = self._next_position
+        self._next_position += 1
+        self._restore_section(section, position)
+        self._record(Edit(f"add section '{section}'", sections_added=((section, position),)))
+        return True
+
+    def delete_section(self, section: str) -> List[UseCase]:
+        """Remove a section and return the use cases it held."""
+        if section not in self._sections:
+            return []
+        cases = list(self._sections[section].values())
+        for case in cases:
+            self._remove(case)
+        position = self._drop_section(section)
+        self._record(Edit(f"delete section '{section}'", removed=tuple(cases),
+                          sections_removed=((section, position),)))
+        return cases
+
+    # Use cases
+    def add(self, section: str, **fields) -> UseCase:
+        """Insert a use case into an existing section and return it."""
+        if section not in self._sections:
+            raise KeyError(section)
+        case = UseCase(self._next_id, section, **fields)
+        self._next_id += 1
+        self._insert(case)
+        self._record(Edit(f"add use case '{case.use_case}'", added=(case,)))
+        return case
+
+    def add_many(self, section: str, rows: Iterable[Dict]) -> List[UseCase]:
+        """Insert several use cases into a section, creating it if needed (one edit)."""
+        with self.grouped(f"import into '{section}'"):
+            self.add_section(section)
+            return [self.add(section, **row) for row in rows]
+
+    def get(self, case_id: int) -> Optional[UseCase]:
+        """Return the use case with the given id, or None."""
+        return self._index.get(case_id)
+
+    def update(self, case_id: int, **fields) -> Optional[UseCase]:
+        """Replace a use case's fields in place; return the new record, or None if the id is unknown."""
+        previous = self._index.get(case_id)
+        if previous is None:
+            return None
+        case = UseCase(case_id, previous.section, **{**previous.to_dict(), **fields})
+        case.version = previous.version + 1
+        self._replace(previous, case)
+        self._record(Edit(f"edit use case '{case.use_case}'", removed=(previous,), added=(case,)))
+        return case
+
+    def delete(self, case_id: int) -> Optional[UseCase]:
+        """Remove a use case by id and return it, or None if it is unknown."""
+        case = self._index.get(case_id)
+        if case is None:
+            return None
+        self._remove(case)
+        self._record(Edit(f"delete use case '{case.use_case}'", removed=(case,)))
+        return case
+
+    def cases(self, section: str) -> Iterable[UseCase]:
+        """Return the use cases of a section in insertion order."""
+        return self._ordered_cases(section).values()
+
+    def all_cases(self) -> Iterable[UseCase]:
+        """Return every use case across all sections."""
+        return self._index.values()
+
+    # Counters
+    def section_size(self, section: str) -> int:
+        """Return the number of use cases in a section."""
+        return len(self._sections.get(section, ()))
+
+    @property
+    def case_count(self) -> int:
+        return len(self._index)
+
+    @property
+    def has_use_cases(self) -> bool:
+        return self._nonempty_sections > 0
+
+    def to_dict(self) -> Dict[str, List[Dict]]:
+        """Return the legacy ``{section: [case dict, ...]}`` layout."""
+        return {
+            section: [case.to_dict() for case in self._ordered_cases(section).values()]
+            for section in self._ordered_sections()
+        }
+
+    # History
+    @contextmanager
+    def grouped(self, label: str) -> Iterator[None]:
+        """Record every change made inside the block as a single edit."""
+        if self._group is not None:
+            yield  # Already inside a group, which takes the outer label
+            return
+        self._group = []
+        try:
+            yield
+        finally:
+            edits, self._group = self._group, None
+            if edits:
+                merged = Edit(label)
+                for edit in edits:
+                    merged = merged.merge(edit)
+                self._record(merged)
+
+    @property
+    def next_undo(self) -> Optional[Edit]:
+        """The edit ``undo`` would revert, or None."""
+        return self._undo[-1] if self._undo else None
+
+    @property
+    def next_redo(self) -> Optional[Edit]:
+        """The edit ``redo`` would reapply, or None."""
+        return self._redo[-1] if self._redo else None
+
+    def undo(self) -> Optional[Edit]:
+        """Revert the latest edit and return it, or None when there is nothing to undo."""
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        self._apply(edit.sections_removed, edit.added, edit.removed, edit.sections_added)
+        self._redo.append(edit)
+        return edit
+
+    def redo(self) -> Optional[Edit]:
+        """Reapply the latest undone edit and return it, or None when there is nothing to redo."""
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        self._apply(edit.sections_added, edit.removed, edit.added, edit.sections_removed)
+        self._undo.append(edit)
+        return edit
+
+    def clear_history(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    def _record(self, edit: Edit):
+        if self._group is not None:
+            self._group.append(edit)
+            return
+        self._undo.append(edit)
+        self._redo.clear()
+
+    def _apply(self, restore_sections, drop_cases, put_cases, drop_sections):
+        """Swap one side of an edit for the other (without recording it)."""
+        for section, position in restore_sections:
+            self._restore_section(section, position)
+        put = {case.id: case for case in put_cases}
+        for case in drop_cases:
+            replacement = put.pop(case.id, None)
+            if replacement is None:
+                self._remove(case)
+            else:
+                self._replace(case, replacement)
+        for case in put.values():
+            self._insert(case)
+        for section, _ in drop_sections:
+            self._drop_section(section)
+
+    # Primitives shared by edits and their undo
+    def _restore_section(self, section: str, position: int):
+        if self._sections and position < self._positions[next(reversed(self._sections))]:
+            self._sections_unsorted = True
+        self._sections[section] = {}
+        self._positions[section] = position
+        self.sections_version += 1
+
+    def _drop_section(self, section: str) -> int:
+        """Remove an empty section and return its position."""
+        del self._sections[section]
+        self._unsorted_cases.discard(section)
+        self.sections_version += 1
+        return self._positions.pop(section)
+
+    def _insert(self, case: UseCase):
+        cases = self._sections[case.section]
+        if not cases:
+            self._nonempty_sections += 1
+        elif case.id < next(reversed(cases)):
+            self._unsorted_cases.add(case.section)
+        cases[case.id] = case
+        self._index[case.id] = case
+        for listener in self._listeners:
+            listener.case_added(case)
+
+    def _remove(self, case: UseCase):
+        cases = self._sections[case.section]
+        del cases[case.id]
+        del self._index[case.id]
+        if not cases:
+            self._nonempty_sections -= 1
+        for listener in self._listeners:
+            listener.case_removed(case)
+
+    def _replace(self, previous: UseCase, case: UseCase):
+        """Swap a record for another with the same id, keeping its place in the section."""
+        self._sections[case.section][case.id] = case
+        self._index[case.id] = case
+        for listener in self._listeners:
+            listener.case_removed(previous)
+            listener.case_added(case)
+
+    def _ordered_sections(self) -> Dict[str, Dict[int, UseCase]]:
+        if self._sections_unsorted:
+            self._sections = dict(sorted(self._sections.items(), key=lambda item: self._positions[item[0]]))
+            self._sections_unsorted = False
+        return self._sections
+
+    def _ordered_cases(self, section: str) -> Dict[int, UseCase]:
+        cases = self._sections.get(section, {})
+        if section in self._unsorted_cases:
+            # Ids grow with insertion, so id order is insertion order
+            cases = self._sections[section] = dict(sorted(cases.items()))
+            self._unsorted_cases.discard(section)
+        return cases
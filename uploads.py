@@ -0,0 +1,147 @@
+"""Content-addressed on-disk spool for uploaded supporting documents.
+
+Uploads are streamed to disk in fixed-size chunks and hashed on the way,
+then stored under their SHA-256 digest, so identical files uploaded by
+different sessions share one copy. Sessions only keep ``SpooledFile``
+references. When the spool grows past its byte budget the least recently
+used objects are evicted, except those still referenced: objects in a live
+session's ``Documents`` (held weakly, so they are released when the
+session is garbage-collected) and whatever the ``referenced`` callback
+reports, such as the documents of saved drafts.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import weakref
+from typing import BinaryIO, Callable, Dict, Iterable, NamedTuple, Optional, Set
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class QuotaExceeded(Exception):
+    """Raised when an upload would take a session past its quota."""
+
+
+class SpooledFile(NamedTuple):
+    """Lightweight reference to a spooled upload."""
+
+    name: str
+    size: int
+    digest: str
+
+
+class Documents(dict):
+    """A session's spooled documents, keyed by digest."""
+
+
+class FileSpool:
+    """Deduplicating file spool with a global size budget and LRU eviction."""
+
+    def __init__(self, root: str, max_bytes: int, chunk_size: int = CHUNK_SIZE,
+                 referenced: Optional[Callable[[], Iterable[str]]] = None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.referenced = referenced
+        self._lock = threading.Lock()
+        self._holders: "weakref.WeakValueDictionary[int, Documents]" = weakref.WeakValueDictionary()
+        self._objects = os.path.join(root, "objects")
+        self._tmp = os.path.join(root, "tmp")
+        os.makedirs(self._objects, exist_ok=True)
+        os.makedirs(self._tmp, exist_ok=True)
+        self._total_bytes = sum(
+            entry.stat().st_size for entry in self._scan()
+        )
+
+    def _scan(self):
+        for bucket in os.scandir(self._objects):
+            if bucket.is_dir():
+                yield from os.scandir(bucket.path)
+
+    def path(self, digest: str) -> str:
+        """Return the on-disk path for a digest."""
+        return os.path.join(self._objects, digest[:2], digest)
+
+    def hold(self, documents: Documents) -> Documents:
+        """Keep the objects in ``documents`` from being evicted for as long as it lives."""
+        with self._lock:
+            self._holders[id(documents)] = documents
+        return documents
+
+    def in_use(self) -> Set[str]:
+        """Return the digests referenced by live sessions and the ``referenced`` callback."""
+        digests = set(self.referenced()) if self.referenced else set()
+        for documents in self._holders.values():
+            digests.update(list(documents))
+        return digests
+
+    def exists(self, ref: SpooledFile) -> bool:
+        return os.path.exists(self.path(ref.digest))
+
+    def open(self, ref: SpooledFile) -> BinaryIO:
+        """Open a spooled file for reading and mark it recently used."""
+        path = self.path(ref.digest)
+        os.utime(path)
+        return open(path, "rb")
+
+    def store(self, fileobj: BinaryIO, name: str, quota: Optional[int] = None) -> SpooledFile:
+        """Stream ``fileobj`` into the spool and return a reference to it.
+
+        ``quota`` is the number of bytes the caller may still add; the copy
+        is abandoned as soon as it is exceeded.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fileobj.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if quota is not None and size > quota:
+                        raise QuotaExceeded(f"'{name}' exceeds the remaining upload quota")
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            ref = SpooledFile(name, size, digest.hexdigest())
+            target = self.path(ref.digest)
+            with self._lock:
+                if os.path.exists(target):
+                    # Already spooled by this or another session
+                    os.utime(target)
+                else:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(tmp_path, target)
+                    self._total_bytes += size
+                    self._evict(keep=ref.digest)
+            return ref
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _evict(self, keep: str):
+        """Drop least recently used unreferenced objects (never ``keep``) until the spool fits its budget."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        in_use = self.in_use() | {keep}
+        entries = sorted(self._scan(), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            if entry.name in in_use:
+                continue
+            size = entry.stat().st_size
+            os.unlink(entry.path)
+            self._total_bytes -= size
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+
+def session_usage(documents: Dict[str, SpooledFile]) -> int:
+    """Return the bytes referenced by a session's documents."""
+    return sum(ref.size for ref in documents.values())